@@ -47,15 +47,25 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.middleware.CompressionMiddleware",
+    "core.middleware.ProfilingMiddleware",
+    "core.middleware.QueryLimitMiddleware",
+    "core.middleware.ServerTimingMiddleware",
+    "core.middleware.SlowQueryMiddleware",
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    "core.middleware.WebSessionMiddleware",
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    "core.middleware.WebCsrfViewMiddleware",
+    "core.middleware.WebAuthenticationMiddleware",
+    "core.middleware.WebMessageMiddleware",
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# security.W003 only knows CsrfViewMiddleware, core.checks checks for its
+# core.middleware.WebCsrfViewMiddleware subclass instead
+SILENCED_SYSTEM_CHECKS = ["security.W003"]
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -80,6 +90,10 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# Milliseconds a statement may run, set when connecting, 0 disables it.
+# Management commands use it too, so long migrations need it off
+STATEMENT_TIMEOUT = int(os.environ.get("STATEMENT_TIMEOUT", 0))
+
 DATABASES = {
     'default': {
         "ENGINE": "django.db.backends.postgresql",
@@ -87,6 +101,9 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "OPTIONS": {
+            "options": f"-c statement_timeout={STATEMENT_TIMEOUT}"
+        } if STATEMENT_TIMEOUT else {},
     }
 }
 
@@ -133,4 +150,141 @@ STATIC_ROOT = "vol/web/static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = "/vol/web/media"
 
-AUTH_USER_MODEL = "core.User"
\ No newline at end of file
+AUTH_USER_MODEL = "core.User"
+
+# Seconds the global recipe analytics stay cached
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get("ANALYTICS_CACHE_TIMEOUT", 300))
+
+# Users whose pantry index is kept in memory by each process
+PANTRY_INDEX_MAX_USERS = int(os.environ.get("PANTRY_INDEX_MAX_USERS", 1000))
+
+# Ingredient ids a pantry may list, matched in memory rather than in SQL
+MAX_PANTRY_IDS = int(os.environ.get("MAX_PANTRY_IDS", 5000))
+
+# Seconds before the first retry of a failed task, doubled on each attempt
+TASK_RETRY_DELAY = int(os.environ.get("TASK_RETRY_DELAY", 10))
+
+# Seconds without a heartbeat after which a running task is considered
+# abandoned and reclaimed, running tasks renew it every third of it
+TASK_LEASE_SECONDS = int(os.environ.get("TASK_LEASE_SECONDS", 600))
+
+# Share of the requests timed and reported with Server-Timing, 0 disables
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get("REQUEST_TIMING_SAMPLE_RATE", 0)
+)
+
+# Seconds between two profiled requests across every process of the service
+PROFILING_INTERVAL = int(os.environ.get("PROFILING_INTERVAL", 60))
+
+# Seconds a signed X-Profile header stays valid
+PROFILING_SIGNATURE_MAX_AGE = int(
+    os.environ.get("PROFILING_SIGNATURE_MAX_AGE", 300)
+)
+
+# Seconds between two stack samples of the sampling profiler
+PROFILING_SAMPLE_INTERVAL = float(
+    os.environ.get("PROFILING_SAMPLE_INTERVAL", 0.005)
+)
+
+# Directory the request profiles are written to
+PROFILING_ROOT = os.environ.get("PROFILING_ROOT", "/vol/web/profiles")
+
+# Bearer token Prometheus sends to read /metrics, staff only when empty
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Statement timeout in ms, queries and DB time in ms a request may use by
+# "View.action", "View" or "default", 0 disabling a limit
+QUERY_LIMITS = {
+    "RecipeViewSet": {
+        "statement_timeout": 5000,
+        "max_queries": 100,
+        "db_time": 10000,
+    },
+    "RecipeAnalyticsView": {"statement_timeout": 15000},
+}
+
+# Ids accepted by the comma separated id filters
+MAX_FILTER_IDS = int(os.environ.get("MAX_FILTER_IDS", 200))
+
+# Milliseconds over which a query is logged as slow, 0 disables the log
+SLOW_QUERY_THRESHOLD = float(os.environ.get("SLOW_QUERY_THRESHOLD", 0))
+
+# Share of the slow queries explained with EXPLAIN (ANALYZE, BUFFERS)
+SLOW_QUERY_EXPLAIN_RATE = float(
+    os.environ.get("SLOW_QUERY_EXPLAIN_RATE", 0.1)
+)
+
+# Milliseconds an EXPLAIN ANALYZE may run before it is cancelled
+SLOW_QUERY_EXPLAIN_TIMEOUT = int(
+    os.environ.get("SLOW_QUERY_EXPLAIN_TIMEOUT", 5000)
+)
+
+# Slow queries kept in memory by each process for the staff view
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", 200))
+
+# Slow queries waiting for their plan, further ones are not explained
+SLOW_QUERY_EXPLAIN_QUEUE = int(
+    os.environ.get("SLOW_QUERY_EXPLAIN_QUEUE", 20)
+)
+
+# File the slow queries are also logged to, none when empty
+SLOW_QUERY_LOG_FILE = os.environ.get("SLOW_QUERY_LOG_FILE", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+        "slow_queries": {
+            "class": "logging.FileHandler",
+            "filename": SLOW_QUERY_LOG_FILE,
+            "delay": True,
+        } if SLOW_QUERY_LOG_FILE else {
+            "class": "logging.NullHandler",
+        },
+    },
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+        },
+        "core.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+        },
+    },
+}
+
+# Rows under which the admin counts a table exactly instead of estimating
+ADMIN_EXACT_COUNT_LIMIT = int(
+    os.environ.get("ADMIN_EXACT_COUNT_LIMIT", 10000)
+)
+
+# Version of the deployed code, a digest of the sources when empty.
+# The API schema is rebuilt when it changes
+CODE_VERSION = os.environ.get("CODE_VERSION", "")
+
+# Directory the built API schema is cached in
+SCHEMA_CACHE_DIR = os.environ.get("SCHEMA_CACHE_DIR", "/vol/web/schema")
+
+# Response encodings by preference, br and zstd need brotli and zstandard
+COMPRESSION_ENCODINGS = os.environ.get(
+    "COMPRESSION_ENCODINGS",
+    "zstd,br,gzip"
+).split(",")
+
+# Compression level of each encoding
+COMPRESSION_LEVELS = {
+    "gzip": int(os.environ.get("COMPRESSION_LEVEL_GZIP", 6)),
+    "br": int(os.environ.get("COMPRESSION_LEVEL_BR", 4)),
+    "zstd": int(os.environ.get("COMPRESSION_LEVEL_ZSTD", 3)),
+}
+
+# Bytes under which responses are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
+# Token authenticated routes skipping the session, CSRF, auth and message
+# middleware
+API_PATH_PREFIXES = ["/api/"]
@@ -18,13 +18,17 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 from django.conf.urls import url
-from rest_framework_swagger.views import get_swagger_view
-
-schema_view = get_swagger_view(title="Recipes API")
+from core.metrics import metrics_view
+from core.profiling import profile_view
+from core.schema import schema_view
+from core.slow_queries import slow_queries_view
 
 urlpatterns = [
     url("swagger/", schema_view),
     path('admin/', admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
+    path("profiles/<str:name>", profile_view, name="profile"),
+    path("slow-queries", slow_queries_view, name="slow-queries"),
     path('api/users/', include("user.urls")),
     path("api/recipes/", include("recipe.urls"))
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,12 +1,55 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 from django.utils.translation import gettext
 from core import models
+from core.deletion import request_deletion
+
+
+def get_estimated_count(model):
+    """Return the planner's row estimate of the table of a model"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting unfiltered large tables from pg_class.reltuples
+
+    Tables estimated under ADMIN_EXACT_COUNT_LIMIT rows and filtered or
+    searched changelists are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not getattr(queryset, "query", None) or queryset.query.where:
+            return super().count
+        estimate = get_estimated_count(queryset.model)
+        if estimate < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin that never counts or lists every row of its table"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class CustomUserAdmin(BaseUserAdmin):
     ordering = ["id"]
     list_display = ["email", "name"]
+    search_fields = ["^email", "^name"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         (gettext("Personal Info"), {"fields": ("name",)}),
@@ -23,8 +66,73 @@ class CustomUserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """List only the users, their data is purged in background"""
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        objs = list(objs)
+
+        return (
+            [str(obj) for obj in objs],
+            {self.opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            []
+        )
+
+    def delete_model(self, request, obj):
+        """Deactivate the user and queue the purge of their data"""
+        request_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        """Deactivate the users and queue the purge of their data"""
+        for user in queryset:
+            request_deletion(user)
+
+
+class TagAdmin(LargeTableAdmin):
+    list_display = ["name", "user"]
+    list_select_related = ["user"]
+    search_fields = ["^name"]
+    raw_id_fields = ["user"]
+
+
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ["name", "user"]
+    list_select_related = ["user"]
+    search_fields = ["^name"]
+    raw_id_fields = ["user"]
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ["title", "user", "time_minutes", "price"]
+    list_select_related = ["user"]
+    search_fields = ["^title"]
+    raw_id_fields = ["user"]
+    autocomplete_fields = ["tags", "ingredients"]
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    ordering = ["-requested_at"]
+    list_display = [
+        "email", "requested_at", "finished_at", "recipes_deleted",
+        "tags_deleted", "ingredients_deleted"
+    ]
+    readonly_fields = [
+        "user_id", "email", "requested_at", "finished_at", "recipes_deleted",
+        "tags_deleted", "ingredients_deleted", "last_error"
+    ]
+
+
+class TaskAdmin(admin.ModelAdmin):
+    ordering = ["-id"]
+    list_display = ["name", "status", "attempts", "run_at", "finished_at"]
+    list_filter = ["status", "name"]
+
 
 admin.site.register(models.User, CustomUserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.AccountDeletion, AccountDeletionAdmin)
+admin.site.register(models.Task, TaskAdmin)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+PASSWORD = "bench-password"
+
+
+def create_dataset(size, tags_per_recipe=3, ingredients_per_recipe=8):
+    """Create a user with a token owning size recipes
+
+    Shared by the benchmark commands, which run it in a transaction they
+    roll back. Each recipe gets tags_per_recipe of the 20 tags and
+    ingredients_per_recipe of the 50 ingredients.
+    """
+    user = get_user_model().objects.create_user(
+        email=f"benchmark-{size}@mysimpleapplication.com",
+        password=PASSWORD,
+        name="Benchmark"
+    )
+    token = Token.objects.create(user=user)
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f"Tag {i}") for i in range(20)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f"Ingredient {i}") for i in range(50)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f"Recipe {i}",
+            time_minutes=i % 120,
+            price=f"{i % 100}.{i % 10}5"
+        )
+        for i in range(size)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for i, recipe in enumerate(recipes)
+        for tag in tags[i % 5:i % 5 + tags_per_recipe]
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.id,
+            ingredient_id=ingredient.id
+        )
+        for i, recipe in enumerate(recipes)
+        for ingredient in ingredients[i % 40:i % 40 + ingredients_per_recipe]
+    )
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return {
+        "size": size,
+        "user": user,
+        "client": client,
+        "anonymous": APIClient(),
+        "recipe_ids": [recipe.id for recipe in recipes],
+        "tag_ids": [tag.id for tag in tags],
+        "ingredient_ids": [ingredient.id for ingredient in ingredients],
+    }
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+CSRF_MIDDLEWARE = (
+    "core.middleware.WebCsrfViewMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+)
+
+
+@register(Tags.security, deploy=True)
+def check_csrf_middleware(app_configs, **kwargs):
+    """Warn when no CSRF middleware is installed
+
+    Stands for security.W003, silenced as it only knows Django's
+    CsrfViewMiddleware and not the WebCsrfViewMiddleware subclass.
+    """
+    if any(name in settings.MIDDLEWARE for name in CSRF_MIDDLEWARE):
+        return []
+    return [Warning(
+        "You don't appear to be using WebCsrfViewMiddleware, your web "
+        "pages will not be protected against CSRF.",
+        hint="Add core.middleware.WebCsrfViewMiddleware to MIDDLEWARE.",
+        id="core.W001",
+    )]
@@ -0,0 +1,107 @@
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(json|javascript|xml|[\w.-]+\+(json|xml))|"
+    r"image/svg\+xml)"
+)
+ACCEPT_ENCODING = re.compile(r"([\w*-]+)\s*(?:;\s*q=([\d.]+))?")
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+
+
+def get_encodings(preferred):
+    """Return the preferred encodings whose library is installed"""
+    return [encoding for encoding in preferred if encoding in COMPRESSORS]
+
+
+def choose_encoding(accept_encoding, encodings):
+    """Return the first of encodings the Accept-Encoding header allows"""
+    accepted = {}
+    for name, quality in ACCEPT_ENCODING.findall(accept_encoding.lower()):
+        try:
+            accepted[name] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type):
+    """Return whether a content type is worth compressing"""
+    return bool(COMPRESSIBLE_TYPES.match(content_type or ""))
+
+
+def compress(encoding, level, data):
+    """Compress data at once"""
+    compressor = COMPRESSORS[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(encoding, level, chunks):
+    """Compress chunks, flushing each so the client gets them right away"""
+    compressor = COMPRESSORS[encoding](level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,143 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from core.models import AccountDeletion, Recipe, RecipeSignature, Tag, \
+     TagUsage, Ingredient
+from core.queue import enqueue
+
+# Rows owned by a user, with the counter tracking them and the rows
+# pointing at them, deleted along with each batch
+PURGE_STEPS = (
+    (Recipe, "recipes_deleted", (
+        (Recipe.tags.through, "recipe_id"),
+        (Recipe.ingredients.through, "recipe_id"),
+        (RecipeSignature, "recipe_id"),
+    )),
+    (Tag, "tags_deleted", (
+        (Recipe.tags.through, "tag_id"),
+        (TagUsage, "tag_id"),
+    )),
+    (Ingredient, "ingredients_deleted", (
+        (Recipe.ingredients.through, "ingredient_id"),
+    )),
+)
+
+
+def request_deletion(user):
+    """Deactivate a user right away and queue the purge of their data"""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        Token.objects.filter(user=user).delete()
+        deletion, _ = AccountDeletion.objects.get_or_create(
+            user_id=user.pk,
+            defaults={"email": user.email}
+        )
+        enqueue(
+            "purge_account",
+            {"deletion_id": deletion.pk},
+            dedup_key=f"purge_account:{deletion.pk}"
+        )
+
+    return deletion
+
+
+def set_lock_timeout(cursor, lock_timeout):
+    """Limit the wait for locks of the current transaction, in ms"""
+    cursor.execute(
+        "SELECT set_config('lock_timeout', %s, true)",
+        [f"{lock_timeout}ms"]
+    )
+
+
+def delete_batch(user_id, model, dependents, batch_size, lock_timeout):
+    """Delete up to batch_size rows of a user and the rows pointing at them
+
+    Runs raw statements in the caller's transaction, so nothing is collected
+    in memory and no signal is sent. Returns the number of rows deleted.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        set_lock_timeout(cursor, lock_timeout)
+        cursor.execute(
+            f"""
+            SELECT id FROM {table} WHERE user_id = %s
+            ORDER BY id LIMIT %s FOR UPDATE
+            """,
+            [user_id, batch_size]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return 0
+        for dependent, column in dependents:
+            cursor.execute(
+                f"DELETE FROM {dependent._meta.db_table} "
+                f"WHERE {column} = ANY(%s)",
+                [ids]
+            )
+        cursor.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", [ids])
+
+    return len(ids)
+
+
+def lock_inactive_user(deletion, lock_timeout):
+    """Lock the user of a deletion, returning False if they are active
+
+    Taken at the start of each purge transaction, so a user reactivated
+    meanwhile keeps what is left, and their deletion is dropped so it is
+    not picked up again.
+    """
+    with connection.cursor() as cursor:
+        set_lock_timeout(cursor, lock_timeout)
+    active = get_user_model().objects.select_for_update().filter(
+        pk=deletion.user_id
+    ).values_list("is_active", flat=True).first()
+    if active:
+        AccountDeletion.objects.filter(pk=deletion.pk).delete()
+        return False
+    return True
+
+
+def purge_user(deletion, batch_size=1000, lock_timeout=2000, pause=0):
+    """Delete the data of a deactivated user batch by batch, then the user
+
+    Each batch commits on its own along with the progress counters, so an
+    interrupted purge resumes where it stopped. Users reactivated in the
+    meantime are left alone and their deletion is dropped, so it is not
+    picked up again. Returns whether the purge finished.
+    """
+    for model, counter, dependents in PURGE_STEPS:
+        deleted = batch_size
+        while deleted == batch_size:
+            with transaction.atomic():
+                if not lock_inactive_user(deletion, lock_timeout):
+                    return False
+                deleted = delete_batch(
+                    deletion.user_id, model, dependents, batch_size,
+                    lock_timeout
+                )
+                if deleted:
+                    AccountDeletion.objects.filter(pk=deletion.pk).update(
+                        **{counter: F(counter) + deleted}
+                    )
+            if deleted and pause:
+                time.sleep(pause)
+
+    with transaction.atomic():
+        if not lock_inactive_user(deletion, lock_timeout):
+            return False
+        # Only small rows are left, collecting them is cheap now
+        get_user_model().objects.filter(
+            pk=deletion.user_id,
+            is_active=False
+        ).delete()
+        AccountDeletion.objects.filter(pk=deletion.pk).update(
+            finished_at=timezone.now(),
+            last_error=""
+        )
+
+    return True
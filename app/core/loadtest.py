@@ -0,0 +1,287 @@
+import asyncio
+import io
+import json
+import random
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+from core.timing import percentile
+
+OPERATIONS = ("login", "list", "detail", "create", "upload")
+
+
+class HttpError(Exception):
+    """Raised for responses the server could not produce"""
+
+
+def get_image():
+    """Return a small JPEG to upload"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class Client:
+    """Minimal asyncio HTTP/1.1 client, one connection per request"""
+
+    def __init__(self, base_url, timeout=30):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+
+    async def request(self, method, path, token=None, json_body=None,
+                      body=b"", content_type=None, query=None):
+        """Send a request and return the status and decoded JSON body"""
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+            content_type = "application/json"
+        target = self.prefix + path
+        if query:
+            target += "?" + urlencode(query)
+        headers = [
+            f"{method} {target} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Connection: close",
+            "Accept: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if content_type:
+            headers.append(f"Content-Type: {content_type}")
+        if token:
+            headers.append(f"Authorization: Token {token}")
+        head = "\r\n".join(headers) + "\r\n\r\n"
+
+        return await asyncio.wait_for(
+            self.send(head.encode("latin-1") + body),
+            self.timeout
+        )
+
+    async def send(self, payload):
+        """Write a raw request and read the response until EOF"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(payload)
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        head, _, content = response.partition(b"\r\n\r\n")
+        try:
+            status = int(head.split(b" ", 2)[1])
+        except (IndexError, ValueError):
+            raise HttpError("Malformed response")
+        try:
+            data = json.loads(content) if content else None
+        except ValueError:
+            data = None
+        return status, data
+
+
+class Recorder:
+    """Collect (time, operation, latency, ok) samples of a run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.samples = []
+
+    def add(self, operation, latency, ok):
+        self.samples.append(
+            (time.perf_counter() - self.started, operation, latency, ok)
+        )
+
+    def summarize(self, samples, seconds):
+        """Return throughput, error rate and latency percentiles in ms"""
+        latencies = [sample[2] for sample in samples]
+        errors = sum(1 for sample in samples if not sample[3])
+        if not samples:
+            return {"requests": 0, "rps": 0.0, "error_rate": 0.0}
+        return {
+            "requests": len(samples),
+            "rps": round(len(samples) / seconds, 1),
+            "error_rate": round(errors / len(samples), 4),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        }
+
+    def windows(self, start, end, interval):
+        """Summarize the samples of [start, end) in interval windows"""
+        summaries = []
+        window = start
+        while window < end:
+            stop = min(window + interval, end)
+            samples = [s for s in self.samples if window <= s[0] < stop]
+            summary = self.summarize(samples, stop - window)
+            summaries.append({"at": round(window, 1), **summary})
+            window = stop
+        return summaries
+
+    def by_operation(self, start, end):
+        """Summarize the samples of [start, end) per operation"""
+        samples = [s for s in self.samples if start <= s[0] < end]
+        return {
+            operation: self.summarize(
+                [sample for sample in samples if sample[1] == operation],
+                end - start
+            )
+            for operation in OPERATIONS
+            if any(sample[1] == operation for sample in samples)
+        }
+
+
+class SimulatedUser:
+    """Replays a weighted mix of operations as one API user"""
+
+    def __init__(self, client, recorder, email, password, mix, image,
+                 rng):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.password = password
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+        self.image = image
+        self.rng = rng
+        self.token = None
+        self.recipe_ids = []
+        self.tag_ids = []
+        self.ingredient_ids = []
+
+    async def timed(self, operation, *args, **kwargs):
+        """Run a request, recording its latency and whether it succeeded"""
+        started = time.perf_counter()
+        try:
+            status, data = await self.client.request(*args, **kwargs)
+        except (OSError, asyncio.TimeoutError, HttpError):
+            status, data = None, None
+        self.recorder.add(
+            operation,
+            time.perf_counter() - started,
+            status is not None and status < 400
+        )
+        return status, data
+
+    async def login(self):
+        status, data = await self.timed(
+            "login",
+            "POST",
+            "/api/users/token/",
+            json_body={"email": self.email, "password": self.password}
+        )
+        if status == 200:
+            self.token = data["token"]
+
+    async def list(self):
+        status, data = await self.timed(
+            "list",
+            "GET",
+            "/api/recipes/recipes/",
+            token=self.token,
+            query={"page_size": 50}
+        )
+        if status == 200:
+            self.recipe_ids = [item["id"] for item in data["results"]]
+
+    async def detail(self):
+        if not self.recipe_ids:
+            return await self.list()
+        await self.timed(
+            "detail",
+            "GET",
+            f"/api/recipes/recipes/{self.rng.choice(self.recipe_ids)}/",
+            token=self.token
+        )
+
+    async def create(self):
+        status, data = await self.timed(
+            "create",
+            "POST",
+            "/api/recipes/recipes/",
+            token=self.token,
+            json_body={
+                "title": f"Load test {uuid.uuid4().hex[:8]}",
+                "time_minutes": self.rng.randint(5, 120),
+                "price": f"{self.rng.uniform(1, 50):.2f}",
+                "tags": self.sample(self.tag_ids, 3),
+                "ingredients": self.sample(self.ingredient_ids, 8),
+            }
+        )
+        if status == 201:
+            self.recipe_ids.append(data["id"])
+
+    async def upload(self):
+        if not self.recipe_ids:
+            return await self.list()
+        boundary = uuid.uuid4().hex
+        head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="image"; '
+            f'filename="load.jpg"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n"
+        )
+        tail = f"\r\n--{boundary}--\r\n"
+        body = head.encode("latin-1") + self.image + tail.encode("latin-1")
+        await self.timed(
+            "upload",
+            "POST",
+            f"/api/recipes/recipes/{self.rng.choice(self.recipe_ids)}"
+            f"/upload-image/",
+            token=self.token,
+            body=body,
+            content_type=f"multipart/form-data; boundary={boundary}"
+        )
+
+    def sample(self, ids, count):
+        return self.rng.sample(ids, min(count, len(ids)))
+
+    async def prepare(self):
+        """Log in and learn the ids the operations need"""
+        await self.login()
+        if self.token is None:
+            return
+        for name, attribute in (("tags", "tag_ids"),
+                                ("ingredients", "ingredient_ids")):
+            status, data = await self.client.request(
+                "GET",
+                f"/api/recipes/{name}/",
+                token=self.token,
+                query={"fields": "id"}
+            )
+            if status == 200:
+                setattr(self, attribute, [item["id"] for item in data])
+        await self.list()
+
+    async def run(self, deadline):
+        """Replay operations until the deadline"""
+        await self.prepare()
+        while time.perf_counter() < deadline:
+            if self.token is None:
+                await self.login()
+                await asyncio.sleep(0.1)
+                continue
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            await getattr(self, operation)()
+
+
+async def run_stage(base_url, credentials, concurrency, duration, mix,
+                    recorder, seed, timeout=30):
+    """Run concurrency simulated users for duration seconds"""
+    client = Client(base_url, timeout=timeout)
+    image = get_image()
+    deadline = time.perf_counter() + duration
+    users = [
+        SimulatedUser(
+            client,
+            recorder,
+            *credentials[index % len(credentials)],
+            mix,
+            image,
+            random.Random(seed + index)
+        )
+        for index in range(concurrency)
+    ]
+    await asyncio.gather(*(user.run(deadline) for user in users))
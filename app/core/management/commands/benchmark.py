@@ -0,0 +1,225 @@
+import itertools
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.benchmarking import PASSWORD, create_dataset
+from core.middleware import QueryCounter
+from core.timing import percentile
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API endpoints in-process"""
+
+    help = (
+        "Drive every API endpoint through the request handler and report "
+        "latency, throughput, queries and memory per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 1000],
+            help="Number of recipes of the benchmark user, one run per size"
+        )
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--output", help="Write the results as JSON")
+        parser.add_argument("--baseline", help="JSON results to compare to")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Relative p95 increase reported as a regression"
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        # The client talks to the handler as testserver, and everything the
+        # benchmark creates is rolled back at the end
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=allowed_hosts), \
+                transaction.atomic():
+            for size in options["sizes"]:
+                context = create_dataset(size)
+                for name, request in self.get_endpoints(context):
+                    results[f"{name}@{size}"] = self.measure(
+                        request,
+                        options["iterations"],
+                        options["warmup"]
+                    )
+            transaction.set_rollback(True)
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({
+                    "created_at": timezone.now().isoformat(),
+                    "python": platform.python_version(),
+                    "iterations": options["iterations"],
+                    "results": results,
+                }, output, indent=2, sort_keys=True)
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                baseline = json.load(baseline)["results"]
+            regressions = self.compare(
+                results,
+                baseline,
+                options["threshold"]
+            )
+            if regressions:
+                raise CommandError(f"{regressions} regressions")
+
+    def get_endpoints(self, context):
+        """Return (name, request) pairs, request taking a unique index"""
+        client = context["client"]
+        anonymous = context["anonymous"]
+        size = context["size"]
+        recipe_ids = context["recipe_ids"] or [None]
+        tag_ids = context["tag_ids"]
+        ingredient_ids = context["ingredient_ids"]
+
+        def detail_url(i):
+            return reverse(
+                "recipe:recipe-detail",
+                args=[recipe_ids[i % len(recipe_ids)]]
+            )
+
+        endpoints = [
+            ("user-create", lambda i: anonymous.post(
+                reverse("user:create"),
+                {
+                    "email": f"benchmark-{size}-{i}@mysimpleapplication.com",
+                    "password": PASSWORD,
+                    "name": "Benchmark"
+                },
+                format="json"
+            )),
+            ("user-token", lambda i: anonymous.post(
+                reverse("user:token"),
+                {"email": context["user"].email, "password": PASSWORD},
+                format="json"
+            )),
+            ("user-me", lambda i: client.get(reverse("user:me"))),
+            ("tag-list", lambda i: client.get(reverse("recipe:tag-list"))),
+            ("tag-create", lambda i: client.post(
+                reverse("recipe:tag-list"),
+                {"name": f"Benchmark {i}"},
+                format="json"
+            )),
+            ("ingredient-list", lambda i: client.get(
+                reverse("recipe:ingredient-list")
+            )),
+            ("ingredient-create", lambda i: client.post(
+                reverse("recipe:ingredient-list"),
+                {"name": f"Benchmark {i}"},
+                format="json"
+            )),
+            ("recipe-list", lambda i: client.get(
+                reverse("recipe:recipe-list")
+            )),
+            ("recipe-list-page", lambda i: client.get(
+                reverse("recipe:recipe-list"),
+                {"page_size": 20, "ordering": "price"}
+            )),
+            ("recipe-create", lambda i: client.post(
+                reverse("recipe:recipe-list"),
+                {
+                    "title": f"Benchmark {i}",
+                    "time_minutes": i % 120,
+                    "price": "9.99",
+                    "tags": tag_ids[i % 10:i % 10 + 3],
+                    "ingredients": ingredient_ids[i % 40:i % 40 + 8],
+                },
+                format="json"
+            )),
+        ]
+        if context["recipe_ids"]:
+            endpoints += [
+                ("recipe-detail", lambda i: client.get(detail_url(i))),
+                ("recipe-update", lambda i: client.patch(
+                    detail_url(i),
+                    {"title": f"Updated {i}"},
+                    format="json"
+                )),
+            ]
+        return endpoints
+
+    def measure(self, request, iterations, warmup):
+        """Time iterations calls of request, then trace one for memory"""
+        index = itertools.count()
+        for _ in range(warmup):
+            request(next(index))
+
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                request_started = time.perf_counter()
+                response = request(next(index))
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(counter.count)
+            errors += response.status_code >= 400
+        elapsed = time.perf_counter() - started
+
+        # Tracing slows allocations down, keep it out of the timed calls
+        tracemalloc.start()
+        try:
+            request(next(index))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "throughput_rps": round(iterations / elapsed, 1),
+            "queries": statistics.median(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+            "errors": errors,
+        }
+
+    def report(self, results):
+        """Write a table of the results"""
+        self.stdout.write(
+            f"{'endpoint':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'req/s':>9}{'queries':>9}{'mem KB':>9}{'errors':>8}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['throughput_rps']:>9.1f}"
+                f"{result['queries']:>9}{result['peak_memory_kb']:>9.1f}"
+                f"{result['errors']:>8}"
+            )
+
+    def compare(self, results, baseline, threshold):
+        """Report the endpoints slower or chattier than the baseline"""
+        regressions = 0
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            slower = result["p95_ms"] > previous["p95_ms"] * (1 + threshold)
+            if slower or result["queries"] > previous["queries"]:
+                regressions += 1
+                self.stderr.write(
+                    f"Regression in {name}: p95 {previous['p95_ms']:.2f}ms "
+                    f"-> {result['p95_ms']:.2f}ms, queries "
+                    f"{previous['queries']} -> {result['queries']}"
+                )
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions"))
+        return regressions
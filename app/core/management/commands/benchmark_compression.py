@@ -0,0 +1,135 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from core import compression
+from core.benchmarking import create_dataset
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 9), "zstd": (1, 3, 9)}
+
+
+class Command(BaseCommand):
+    """Django command to weigh compression CPU time against bytes saved"""
+
+    help = (
+        "Compress recipe payloads of the API with every available encoding "
+        "and level, reporting size, ratio and time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000],
+            help="Number of recipes listed, one payload set per size"
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--encodings",
+            nargs="+",
+            default=list(LEVELS),
+            help="Encodings to compare, skipped when not installed"
+        )
+        parser.add_argument("--output", help="Write the results as JSON")
+
+    def handle(self, *args, **options):
+        encodings = compression.get_encodings(options["encodings"])
+        if not encodings:
+            raise CommandError("None of the encodings is installed")
+        missing = set(options["encodings"]).difference(encodings)
+        if missing:
+            self.stderr.write(
+                f"Skipping {', '.join(sorted(missing))}, not installed"
+            )
+
+        payloads = self.get_payloads(options["sizes"])
+        results = []
+        for name, chunks in payloads.items():
+            for encoding in encodings:
+                for level in LEVELS[encoding]:
+                    results.append({
+                        "payload": name,
+                        "encoding": encoding,
+                        "level": level,
+                        **self.measure(
+                            encoding,
+                            level,
+                            chunks,
+                            options["iterations"]
+                        ),
+                    })
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({"results": results}, output, indent=2)
+
+    def get_payloads(self, sizes):
+        """Return the response chunks of recipe endpoints by payload name"""
+        payloads = {}
+        # Everything the payloads are built from is rolled back at the end
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        with override_settings(ALLOWED_HOSTS=allowed_hosts), \
+                transaction.atomic():
+            for size in sizes:
+                context = create_dataset(size)
+                client = context["client"]
+                url = reverse("recipe:recipe-list")
+                payloads[f"recipe-list@{size}"] = [
+                    client.get(url).content
+                ]
+                payloads[f"recipe-list-include@{size}"] = [
+                    client.get(url, {"include": "tags,ingredients"}).content
+                ]
+                payloads[f"recipe-list-stream@{size}"] = list(
+                    client.get(url, {"format": "json-stream"})
+                    .streaming_content
+                )
+            transaction.set_rollback(True)
+        return payloads
+
+    def measure(self, encoding, level, chunks, iterations):
+        """Time compressing chunks, streamed when there are several"""
+        raw = sum(len(chunk) for chunk in chunks)
+        times = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            if len(chunks) == 1:
+                compressed = len(
+                    compression.compress(encoding, level, chunks[0])
+                )
+            else:
+                compressed = sum(
+                    len(data) for data in
+                    compression.compress_stream(encoding, level, chunks)
+                )
+            times.append(time.perf_counter() - started)
+        elapsed = statistics.median(times)
+        return {
+            "raw_bytes": raw,
+            "compressed_bytes": compressed,
+            "ratio": round(raw / compressed, 2),
+            "ms": round(elapsed * 1000, 3),
+            "mb_per_s": round(raw / elapsed / 1e6, 1),
+        }
+
+    def report(self, results):
+        """Write a table of the results"""
+        self.stdout.write(
+            f"{'payload':<28}{'encoding':>9}{'level':>6}{'raw KB':>10}"
+            f"{'out KB':>9}{'ratio':>7}{'ms':>9}{'MB/s':>8}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['payload']:<28}{result['encoding']:>9}"
+                f"{result['level']:>6}{result['raw_bytes'] / 1024:>10.1f}"
+                f"{result['compressed_bytes'] / 1024:>9.1f}"
+                f"{result['ratio']:>7.2f}{result['ms']:>9.3f}"
+                f"{result['mb_per_s']:>8.1f}"
+            )
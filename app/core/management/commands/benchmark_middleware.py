@@ -0,0 +1,117 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.benchmarking import create_dataset
+
+# The Django middleware each route aware one stands in for
+FULL_STACK = {
+    "core.middleware.WebSessionMiddleware":
+        "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.WebCsrfViewMiddleware":
+        "django.middleware.csrf.CsrfViewMiddleware",
+    "core.middleware.WebAuthenticationMiddleware":
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.WebMessageMiddleware":
+        "django.contrib.messages.middleware.MessageMiddleware",
+}
+
+
+class Command(BaseCommand):
+    """Django command to measure the middleware overhead of API requests"""
+
+    help = (
+        "Time API requests through the route aware middleware and through "
+        "the full session, CSRF, auth and message stack"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=300)
+        parser.add_argument("--rounds", type=int, default=10)
+        parser.add_argument("--output", help="Write the results as JSON")
+
+    def handle(self, *args, **options):
+        stacks = {
+            "full": [
+                FULL_STACK.get(name, name) for name in settings.MIDDLEWARE
+            ],
+            "lean": list(settings.MIDDLEWARE),
+        }
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        timings = {}
+        with override_settings(ALLOWED_HOSTS=allowed_hosts), \
+                transaction.atomic():
+            token = Token.objects.get(user=create_dataset(0)["user"])
+            clients = {
+                stack: self.get_client(middleware, token)
+                for stack, middleware in stacks.items()
+            }
+            # Alternate the stacks so drift affects both alike
+            for _ in range(options["rounds"]):
+                for stack, client in clients.items():
+                    for name, request in self.get_endpoints(client):
+                        timings.setdefault((name, stack), []).extend(
+                            self.measure(request, options["iterations"])
+                        )
+            transaction.set_rollback(True)
+
+        results = {
+            f"{name}@{stack}": {
+                "p50_us": round(statistics.median(latencies) * 1e6, 1),
+                "mean_us": round(statistics.mean(latencies) * 1e6, 1),
+            }
+            for (name, stack), latencies in timings.items()
+        }
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({"results": results}, output, indent=2)
+
+    def get_client(self, middleware, token):
+        """Return a client whose handler loaded the middleware"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        with override_settings(MIDDLEWARE=middleware):
+            client.get(reverse("user:me"))
+        return client
+
+    def get_endpoints(self, client):
+        """Return (name, request) pairs of API requests"""
+        return [
+            ("user-me", lambda: client.get(reverse("user:me"))),
+            ("recipe-list", lambda: client.get(
+                reverse("recipe:recipe-list")
+            )),
+        ]
+
+    def measure(self, request, iterations):
+        """Return the latency of iterations calls of request"""
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            request()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def report(self, results):
+        """Write the latency per endpoint and stack, and the saving"""
+        self.stdout.write(f"{'request':<28}{'p50 us':>10}{'mean us':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28}{result['p50_us']:>10.1f}"
+                f"{result['mean_us']:>10.1f}"
+            )
+        for name in sorted({key.split("@")[0] for key in results}):
+            full = results[f"{name}@full"]["p50_us"]
+            lean = results[f"{name}@lean"]["p50_us"]
+            self.stdout.write(
+                f"{name}: {full - lean:.1f}us saved per request "
+                f"({(full - lean) / full:.1%})"
+            )
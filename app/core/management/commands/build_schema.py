@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core import schema
+
+
+class Command(BaseCommand):
+    """Django command to prebuild the API schema of the deployed code"""
+
+    help = "Generate the API schema once and cache it on disk"
+
+    def handle(self, *args, **options):
+        path = schema.build_schema()
+        self.stdout.write(self.style.SUCCESS(
+            f"Schema of version {schema.get_code_version()} written to {path}"
+        ))
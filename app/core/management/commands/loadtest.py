@@ -0,0 +1,209 @@
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.loadtest import OPERATIONS, Recorder, run_stage
+
+
+def parse_mix(value):
+    """Parse login=1,list=5 into a dict of operation weights"""
+    mix = {}
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise CommandError(f"Unknown operation: {operation}")
+        try:
+            mix[operation] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight: {item}")
+    return mix
+
+
+class Command(BaseCommand):
+    """Django command to replay concurrent API traffic against a server"""
+
+    help = (
+        "Replay a mix of logins, reads, creates and uploads from many "
+        "concurrent users and report latency over time and saturation"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--start-server",
+            action="store_true",
+            help="Start runserver on the --url port for the run"
+        )
+        parser.add_argument(
+            "--stages",
+            type=int,
+            nargs="+",
+            default=[10, 50, 100],
+            help="Concurrent users of each stage"
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30,
+            help="Seconds per stage"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds per reported window"
+        )
+        parser.add_argument(
+            "--mix",
+            default="login=1,list=5,detail=5,create=2,upload=1",
+            help="Comma separated operation=weight pairs"
+        )
+        parser.add_argument(
+            "--email-prefix",
+            default="seed-",
+            help="Log in as the active users whose email starts with this"
+        )
+        parser.add_argument("--password", default="seed-password")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results as JSON")
+
+    def handle(self, *args, **options):
+        options["mix"] = parse_mix(options["mix"])
+        credentials = [
+            (email, options["password"])
+            for email in get_user_model().objects.filter(
+                email__startswith=options["email_prefix"],
+                is_active=True
+            ).order_by("id").values_list("email", flat=True)[
+                :max(options["stages"])
+            ]
+        ]
+        if not credentials:
+            raise CommandError(
+                "No users to log in as, run seed_data or set --email-prefix"
+            )
+
+        server = None
+        if options["start_server"]:
+            server = self.start_server(options["url"])
+        try:
+            stages = self.run(credentials, options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        saturation = self.find_saturation(stages)
+        if saturation is not None:
+            self.stdout.write(self.style.WARNING(
+                f"Saturated at {saturation} concurrent users"
+            ))
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(
+                    {"stages": stages, "saturation": saturation},
+                    output,
+                    indent=2
+                )
+
+    def run(self, credentials, options):
+        """Run every stage and return their summaries"""
+        recorder = Recorder()
+        stages = []
+        loop = asyncio.new_event_loop()
+        try:
+            for concurrency in options["stages"]:
+                start = time.perf_counter() - recorder.started
+                loop.run_until_complete(run_stage(
+                    options["url"],
+                    credentials,
+                    concurrency,
+                    options["duration"],
+                    options["mix"],
+                    recorder,
+                    options["seed"],
+                    timeout=options["timeout"]
+                ))
+                end = time.perf_counter() - recorder.started
+                stage = {
+                    "concurrency": concurrency,
+                    "windows": recorder.windows(
+                        start,
+                        end,
+                        options["interval"]
+                    ),
+                    "operations": recorder.by_operation(start, end),
+                    **recorder.summarize(
+                        [s for s in recorder.samples if start <= s[0] < end],
+                        end - start
+                    ),
+                }
+                self.report(stage)
+                stages.append(stage)
+        finally:
+            loop.close()
+        return stages
+
+    def report(self, stage):
+        """Write the windows and per operation summary of a stage"""
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{stage['concurrency']} users: {stage['requests']} requests, "
+            f"{stage['rps']} req/s, {stage['error_rate']:.2%} errors"
+        ))
+        for name, summary in [
+            (f"t={window['at']}s", window) for window in stage["windows"]
+        ] + list(stage["operations"].items()):
+            if not summary["requests"]:
+                continue
+            self.stdout.write(
+                f"  {name:<12}{summary['rps']:>8} req/s"
+                f"{summary['p50_ms']:>9} p50{summary['p95_ms']:>9} p95"
+                f"{summary['p99_ms']:>9} p99{summary['error_rate']:>8.2%}"
+            )
+
+    def find_saturation(self, stages):
+        """Return the concurrency past which throughput stopped growing
+
+        A stage saturates when it fails more than 1% of the requests, or
+        when its throughput grew less than 10% while p95 grew over 50%.
+        """
+        previous = None
+        for stage in stages:
+            if stage["requests"] and stage["error_rate"] > 0.01:
+                return previous["concurrency"] if previous else \
+                    stage["concurrency"]
+            if previous and previous["requests"] and stage["requests"]:
+                flat = stage["rps"] < previous["rps"] * 1.1
+                slower = stage["p95_ms"] > previous["p95_ms"] * 1.5
+                if flat and slower:
+                    return previous["concurrency"]
+            previous = stage
+        return None
+
+    def start_server(self, url):
+        """Start runserver on the port of url and wait for it to listen"""
+        address = urlsplit(url)
+        host, port = address.hostname, address.port or 80
+        server = subprocess.Popen(
+            [sys.executable, "manage.py", "runserver", "--noreload",
+             f"{host}:{port}"],
+            cwd=settings.BASE_DIR
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"Server did not start on {host}:{port}")
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.utils import OperationalError
+from core.deletion import purge_user
+from core.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    """Django command to purge the data of deactivated users in batches"""
+
+    help = "Delete the data of users who asked for their account deletion"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--lock-timeout",
+            type=int,
+            default=2000,
+            help="Milliseconds a batch waits for locks before giving up"
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches"
+        )
+
+    def handle(self, *args, **options):
+        deletions = AccountDeletion.objects.filter(
+            finished_at__isnull=True
+        ).order_by("requested_at")
+        purged = 0
+        for deletion in deletions:
+            try:
+                purged += purge_user(
+                    deletion,
+                    batch_size=options["batch_size"],
+                    lock_timeout=options["lock_timeout"],
+                    pause=options["pause"]
+                )
+            except OperationalError as error:
+                # Typically a lock timeout, the next run resumes the purge
+                AccountDeletion.objects.filter(pk=deletion.pk).update(
+                    last_error=str(error)
+                )
+                self.stderr.write(f"Purge of {deletion} failed: {error}")
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} users"))
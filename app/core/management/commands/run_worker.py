@@ -0,0 +1,101 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from core import queue
+
+
+class Command(BaseCommand):
+    """Django command to run the tasks queued in the database"""
+
+    help = "Run queued background tasks with a pool of threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty"
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no task is due instead of polling"
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print the queue metrics and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            metrics = queue.get_metrics()
+            for status, count in metrics["depth"].items():
+                self.stdout.write(f"depth_{status} {count}")
+            self.stdout.write(
+                f"oldest_pending_seconds {metrics['oldest_pending_seconds']}"
+            )
+            self.stdout.write(
+                f"avg_wait_seconds {metrics['avg_wait_seconds']}"
+            )
+            return
+
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        self.counts = {}
+        self.lock = threading.Lock()
+
+        if options["threads"] <= 1:
+            self.work(stop, options)
+        else:
+            threads = [
+                threading.Thread(target=self.work, args=(stop, options))
+                for _ in range(options["threads"])
+            ]
+            for thread in threads:
+                thread.start()
+            try:
+                for thread in threads:
+                    thread.join()
+            except KeyboardInterrupt:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+
+        summary = ", ".join(
+            f"{count} {status}" for status, count in sorted(
+                self.counts.items()
+            )
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker stopped: {summary or 'no tasks run'}"
+        ))
+
+    def work(self, stop, options):
+        """Claim and run tasks until stopped, or drained with --once"""
+        try:
+            while not stop.is_set():
+                claimed = queue.claim()
+                if not claimed:
+                    if options["once"]:
+                        return
+                    stop.wait(options["poll_interval"])
+                    continue
+                for task in claimed:
+                    try:
+                        status = queue.run(task)
+                    except DatabaseError:
+                        # The lease expires and another attempt claims it
+                        queue.logger.exception(
+                            "task=%s id=%s not recorded", task.name, task.pk
+                        )
+                        status = "error"
+                    with self.lock:
+                        self.counts[status] = self.counts.get(status, 0) + 1
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
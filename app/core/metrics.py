@@ -0,0 +1,74 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, \
+     Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+from core.profiling import get_staff_user
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, float("inf"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route, method and status",
+    ["route", "method", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled",
+    multiprocess_mode="livesum"
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per request by route and method",
+    ["route", "method"],
+    buckets=QUERY_BUCKETS
+)
+LOGIN_ATTEMPTS = Counter(
+    "auth_login_attempts_total",
+    "Token login attempts by result",
+    ["result"]
+)
+UPLOADED_BYTES = Counter(
+    "recipe_image_upload_bytes_total",
+    "Bytes of recipe images uploaded"
+)
+
+
+def get_registry():
+    """Return the registry to expose
+
+    When prometheus_multiproc_dir is set every worker process writes its
+    samples to memory mapped files there, aggregated on each scrape. Dead
+    workers have to be reported with multiprocess.mark_process_dead, e.g.
+    from the gunicorn child_exit hook.
+    """
+    if "prometheus_multiproc_dir" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def is_scraper(request):
+    """Return whether a request carries the METRICS_TOKEN bearer token"""
+    keyword, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(
+        " "
+    )
+    return bool(settings.METRICS_TOKEN) and keyword == "Bearer" and \
+        hmac.compare_digest(token, settings.METRICS_TOKEN)
+
+
+def metrics_view(request):
+    """Expose the metrics in the Prometheus text format
+
+    Only scrapers sending METRICS_TOKEN and staff users may read them.
+    """
+    if not is_scraper(request) and not request.user.is_staff and \
+            get_staff_user(request) is None:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()),
+        content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,359 @@
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import OperationalError, connection
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import patch_vary_headers
+from core import compression, metrics, profiling, query_limits, \
+     slow_queries, timing
+
+logger = logging.getLogger("core.timing")
+
+
+def get_view_label(view_func, request):
+    """Return the view class and, for viewsets, the action of a request"""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return getattr(view_func, "__name__", "unknown")
+    actions = getattr(view_func, "actions", None) or {}
+    action = actions.get(request.method.lower())
+    return f"{cls.__name__}.{action}" if action else cls.__name__
+
+
+def get_route(request):
+    """Return the URL name of a request, a bounded label for metrics"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name
+
+
+class QueryCounter:
+    """connection.execute_wrapper hook counting queries"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Record latency, requests in flight and queries per route"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+
+        route = get_route(request)
+        metrics.REQUEST_LATENCY.labels(
+            route,
+            request.method,
+            response.status_code
+        ).observe(time.perf_counter() - started)
+        metrics.REQUEST_QUERIES.labels(route, request.method).observe(
+            queries.count
+        )
+        return response
+
+
+class CompressionMiddleware:
+    """Compress text responses with the best encoding the client accepts
+
+    COMPRESSION_ENCODINGS lists the encodings by preference, those whose
+    library is missing are skipped. Bodies under COMPRESSION_MIN_SIZE
+    bytes and media types that are already compressed are sent as is.
+    Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = compression.get_encodings(
+            settings.COMPRESSION_ENCODINGS
+        )
+        self.levels = settings.COMPRESSION_LEVELS
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header("Content-Encoding") or \
+                not compression.is_compressible(response.get("Content-Type")):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            self.encodings
+        )
+        if encoding is None or "no-transform" in response.get(
+            "Cache-Control",
+            ""
+        ):
+            return response
+
+        level = self.levels[encoding]
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                encoding,
+                level,
+                response.streaming_content
+            )
+            del response["Content-Length"]
+        else:
+            content = compression.compress(encoding, level, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # A strong ETag names the uncompressed bytes
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile single requests that staff ask for with an X-Profile header
+
+    Only one request is profiled per PROFILING_INTERVAL, the others are
+    served as usual so the header cannot be used to slow the service down.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if "HTTP_X_PROFILE" not in request.META:
+            return self.get_response(request)
+        mode = profiling.get_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        if not profiling.acquire():
+            response = self.get_response(request)
+            response["X-Profile"] = "rate-limited"
+            return response
+
+        response, name = profiling.profile(request, self.get_response, mode)
+        response["X-Profile"] = name
+        logger.info("profile=%s mode=%s path=%s", name, mode, request.path)
+        return response
+
+
+class ClosingCallback:
+    """Call a function when the response it is attached to is closed"""
+
+    def __init__(self, callback):
+        self.close = callback
+
+
+class QueryLimitMiddleware:
+    """Apply the QUERY_LIMITS of the view handling a request
+
+    Routes with their own statement_timeout get it for the request, set
+    on the connection and reset once the response is closed. A request
+    going over its query budget or statement timeout gets a 503. Streamed
+    responses stay under both while streaming, but going over them then
+    cuts the response short, its status being already sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = query_limits.QueryBudget()
+        with connection.execute_wrapper(request.query_budget):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = query_limits.iter_within_budget(
+                response.streaming_content,
+                request.query_budget
+            )
+        if getattr(request, "statement_timeout_set", False):
+            if response.streaming:
+                # The queries of streamed responses run while streaming
+                response._closable_objects.append(
+                    ClosingCallback(query_limits.reset_statement_timeout)
+                )
+            else:
+                query_limits.reset_statement_timeout()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Set the statement timeout and budget of the view"""
+        limits = query_limits.get_limits(get_view_label(view_func, request))
+        request.query_budget.max_queries = limits.get("max_queries", 0)
+        request.query_budget.max_db_time = limits.get("db_time", 0)
+        statement_timeout = limits["statement_timeout"]
+        if statement_timeout != settings.STATEMENT_TIMEOUT:
+            query_limits.set_statement_timeout(statement_timeout)
+            request.statement_timeout_set = True
+
+    def process_exception(self, request, exception):
+        """Answer requests stopped by their limits with a 503"""
+        if isinstance(exception, query_limits.QueryBudgetExceeded):
+            detail = f"Request over its query budget: {exception}."
+        elif isinstance(exception, OperationalError) and \
+                query_limits.is_statement_timeout(exception):
+            detail = "Request over its statement timeout."
+        else:
+            return None
+        return JsonResponse({"detail": detail}, status=503)
+
+
+class SlowQueryMiddleware:
+    """Log the queries slower than SLOW_QUERY_THRESHOLD ms, 0 disables"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.SLOW_QUERY_THRESHOLD
+        self.explain_rate = settings.SLOW_QUERY_EXPLAIN_RATE
+
+    def __call__(self, request):
+        if not self.threshold:
+            return self.get_response(request)
+        request.slow_query_recorder = slow_queries.SlowQueryRecorder(
+            self.threshold,
+            self.explain_rate
+        )
+        with connection.execute_wrapper(request.slow_query_recorder):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Remember which view and action issues the queries"""
+        recorder = getattr(request, "slow_query_recorder", None)
+        if recorder is not None:
+            recorder.view = get_view_label(view_func, request)
+
+
+class ServerTimingMiddleware:
+    """Report DB, view and render time of sampled requests
+
+    A REQUEST_TIMING_SAMPLE_RATE share of the requests is timed, reported
+    in a Server-Timing header and logged one line per request. Requests
+    left out only pay for a random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = timing.start()
+        try:
+            with connection.execute_wrapper(timings.record_query):
+                response = self.get_response(request)
+        finally:
+            timing.stop()
+
+        response["Server-Timing"] = timings.get_header()
+        logger.info(
+            "view=%s method=%s status=%s queries=%s db_ms=%.1f %s"
+            "total_ms=%.1f",
+            getattr(request, "timing_label", "unknown"),
+            request.method,
+            response.status_code,
+            timings.queries,
+            timings.db * 1000,
+            "".join(
+                f"{phase}_ms={seconds * 1000:.1f} "
+                for phase, seconds in timings.phases.items()
+            ),
+            (time.perf_counter() - timings.started) * 1000
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Remember which view and action handles the request, and when"""
+        timings = timing.current()
+        if timings is not None:
+            request.timing_label = get_view_label(view_func, request)
+            request.timing_view = (time.perf_counter(), timings.db)
+
+    def process_template_response(self, request, response):
+        """Time the views and the rendering of DRF responses
+
+        Every DRF view returns an unrendered response, so the time the view
+        spent outside queries is reported as view whichever view handled
+        the request. It covers authentication, permission checks, parsing,
+        validating and serializing data.
+        """
+        timings = timing.current()
+        if timings is None:
+            return response
+        started = time.perf_counter()
+        if hasattr(request, "timing_view"):
+            view_started, db = request.timing_view
+            timings.add(
+                "view",
+                started - view_started - (timings.db - db)
+            )
+
+        def rendered(response):
+            timings.add("render", time.perf_counter() - started)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class WebOnlyMixin:
+    """Skip a middleware on the API_PATH_PREFIXES routes
+
+    The API authenticates with tokens, so it needs neither sessions,
+    messages, CSRF checks nor the session based request.user.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.api_prefixes = tuple(settings.API_PATH_PREFIXES)
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.api_prefixes):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class WebSessionMiddleware(WebOnlyMixin, SessionMiddleware):
+    pass
+
+
+class WebCsrfViewMiddleware(WebOnlyMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if request.path_info.startswith(self.api_prefixes):
+            return None
+        return super().process_view(
+            request,
+            callback,
+            callback_args,
+            callback_kwargs
+        )
+
+
+class WebAuthenticationMiddleware(WebOnlyMixin, AuthenticationMiddleware):
+    pass
+
+
+class WebMessageMiddleware(WebOnlyMixin, MessageMiddleware):
+    pass
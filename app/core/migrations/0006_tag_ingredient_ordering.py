@@ -0,0 +1,21 @@
+# Generated by Django 2.1.15 on 2026-10-19 06:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'ordering': ('id',)},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'ordering': ('id',)},
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:02
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSignature',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.Recipe')),
+                ('buckets', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), size=None)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipesignature',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['buckets'], name='core_recipe_buckets_c9db51_gin'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_signature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipestats',
+            name='ingredients_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
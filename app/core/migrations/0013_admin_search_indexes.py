@@ -0,0 +1,29 @@
+from django.db import migrations
+
+SEARCH_INDEXES = [
+    ("core_user_email_upper_like", "core_user", "email"),
+    ("core_user_name_upper_like", "core_user", "name"),
+    ("core_tag_name_upper_like", "core_tag", "name"),
+    ("core_ingredient_name_upper_like", "core_ingredient", "name"),
+    ("core_recipe_title_upper_like", "core_recipe", "title"),
+]
+
+
+class Migration(migrations.Migration):
+    """Index the UPPER(column) LIKE prefix searches of the admin"""
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_task'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} (UPPER({column}::text) text_pattern_ops)",
+            f"DROP INDEX CONCURRENTLY IF EXISTS {name}",
+        )
+        for name, table, column in SEARCH_INDEXES
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimit',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('acquired_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_rate_limit'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipestats',
+            name='ingredients_version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            "CREATE SEQUENCE core_recipestats_ingredients_version_seq; "
+            "SELECT setval('core_recipestats_ingredients_version_seq', "
+            "COALESCE(MAX(ingredients_version), 0) + 1, false) "
+            "FROM core_recipestats",
+            "DROP SEQUENCE core_recipestats_ingredients_version_seq",
+        ),
+    ]
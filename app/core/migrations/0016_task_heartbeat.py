@@ -0,0 +1,22 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_ingredients_version_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE core_task SET heartbeat_at = started_at",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -2,9 +2,12 @@ import uuid
 import os
 
 from django.db import models
+from django.contrib.postgres.fields import ArrayField, JSONField
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
      PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
 
 
 def recipe_image_file_path(instance, file_name):
@@ -54,6 +57,9 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        ordering = ("id",)
+
     def __str__(self):
         return self.name
 
@@ -66,6 +72,9 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        ordering = ("id",)
+
     def __str__(self):
         return self.name
 
@@ -84,5 +93,141 @@ class Recipe(models.Model):
     tags = models.ManyToManyField("Tag")
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
 
+    class Meta:
+        # Back the range filters and keyset pages of a user's recipes
+        indexes = [
+            models.Index(fields=["user", "time_minutes", "id"]),
+            models.Index(fields=["user", "price", "id"]),
+            models.Index(fields=["user", "title", "id"]),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Keep the loaded values so writes can be applied as deltas"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return self.title
+
+
+class RecipeStats(models.Model):
+    """Summary of the recipes of a user, kept current on writes"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="recipe_stats"
+    )
+    recipe_count = models.IntegerField(default=0)
+    total_time_minutes = models.BigIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    tag_count = models.IntegerField(default=0)
+    ingredient_count = models.IntegerField(default=0)
+    # Drawn from a sequence on every change of the ingredients of the user's
+    # recipes, so a rolled back change never leaves its version reused
+    ingredients_version = models.BigIntegerField(default=0)
+
+    @property
+    def avg_time_minutes(self):
+        if not self.recipe_count:
+            return None
+        return round(self.total_time_minutes / self.recipe_count, 2)
+
+
+class TagUsage(models.Model):
+    """Number of recipes using a tag, kept current on writes"""
+    tag = models.OneToOneField(
+        "Tag",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="usage"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-recipe_count"])]
+
+
+class RecipeSignature(models.Model):
+    """MinHash LSH buckets of the ingredients and tags of a recipe"""
+    recipe = models.OneToOneField(
+        "Recipe",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="signature"
+    )
+    buckets = ArrayField(models.BigIntegerField())
+
+    class Meta:
+        indexes = [GinIndex(fields=["buckets"])]
+
+
+class AccountDeletion(models.Model):
+    """Progress of the background purge of a deactivated user"""
+    # Not a foreign key, the row outlives the user it records
+    user_id = models.IntegerField(unique=True)
+    email = models.EmailField(max_length=255)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    recipes_deleted = models.IntegerField(default=0)
+    tags_deleted = models.IntegerField(default=0)
+    ingredients_deleted = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.email
+
+
+class Task(models.Model):
+    """Background job stored in the database and run by run_worker"""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=255)
+    payload = JSONField(default=dict)
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    # Only one pending task per key, enforced by a partial unique index
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Renewed while the task runs, the lease expires TASK_LEASE_SECONDS after
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+
+class RateLimit(models.Model):
+    """Last time a service wide slot was taken, shared by every process"""
+    name = models.CharField(max_length=255, primary_key=True)
+    acquired_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
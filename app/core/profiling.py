@@ -0,0 +1,166 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.http import FileResponse, Http404, HttpResponseForbidden
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from core.models import RateLimit
+
+MODES = ("cprofile", "sample")
+SIGNING_SALT = "core.profiling"
+RATE_LIMIT_KEY = "core.profiling.last"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.(prof|collapsed)$")
+
+
+def sign_mode(mode):
+    """Return an X-Profile header value accepted without a staff token"""
+    return signing.dumps(mode, salt=SIGNING_SALT)
+
+
+def get_staff_user(request):
+    """Return the staff user of the token of a request, if any"""
+    keyword, _, key = request.META.get("HTTP_AUTHORIZATION", "").partition(
+        " "
+    )
+    if keyword != "Token" or not key:
+        return None
+    token = Token.objects.select_related("user").filter(key=key).first()
+    if token is None or not token.user.is_active or not token.user.is_staff:
+        return None
+    return token.user
+
+
+def get_mode(request):
+    """Return the profiler a request asked for and is allowed to use
+
+    X-Profile holds either a mode, honoured for staff tokens only, or a
+    mode signed with sign_mode within PROFILING_SIGNATURE_MAX_AGE.
+    """
+    value = request.META.get("HTTP_X_PROFILE")
+    if not value:
+        return None
+    if value in MODES:
+        return value if get_staff_user(request) is not None else None
+    try:
+        mode = signing.loads(
+            value,
+            salt=SIGNING_SALT,
+            max_age=settings.PROFILING_SIGNATURE_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return mode if mode in MODES else None
+
+
+def acquire():
+    """Take the service wide profiling slot, free once per PROFILING_INTERVAL
+
+    The slot is a row in the database, so every worker process and host
+    shares it, and the upsert takes it atomically.
+    """
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {RateLimit._meta.db_table} (name, acquired_at)
+            VALUES (%(name)s, %(now)s)
+            ON CONFLICT (name) DO UPDATE SET acquired_at = %(now)s
+            WHERE {RateLimit._meta.db_table}.acquired_at <= %(expired)s
+            RETURNING name
+            """,
+            {
+                "name": RATE_LIMIT_KEY,
+                "now": now,
+                "expired": now - timedelta(
+                    seconds=settings.PROFILING_INTERVAL
+                ),
+            }
+        )
+        return cursor.fetchone() is not None
+
+
+class StackSampler:
+    """Sample the stack of a thread into flamegraph collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path):
+        with open(path, "w") as output:
+            output.writelines(
+                f"{stack} {count}\n" for stack, count in self.stacks.items()
+            )
+
+
+def profile(request, get_response, mode):
+    """Handle a request under a profiler, return the response and file name
+
+    cprofile writes pstats output, sample writes collapsed stacks that
+    flamegraph.pl and speedscope read.
+    """
+    os.makedirs(settings.PROFILING_ROOT, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    if mode == "cprofile":
+        name += ".prof"
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        profiler.dump_stats(os.path.join(settings.PROFILING_ROOT, name))
+    else:
+        name += ".collapsed"
+        with StackSampler(
+            threading.get_ident(),
+            settings.PROFILING_SAMPLE_INTERVAL
+        ) as sampler:
+            response = get_response(request)
+        sampler.write(os.path.join(settings.PROFILING_ROOT, name))
+    return response, name
+
+
+def profile_view(request, name):
+    """Download a stored profile, staff only"""
+    if not request.user.is_staff and get_staff_user(request) is None:
+        return HttpResponseForbidden()
+    path = os.path.join(settings.PROFILING_ROOT, name)
+    if not PROFILE_NAME.match(name) or not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
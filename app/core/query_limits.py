@@ -0,0 +1,100 @@
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+QUERY_CANCELED = "57014"
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a request runs more queries or DB time than allowed"""
+
+
+def get_limits(label):
+    """Return the limits of a view label, falling back to its class
+
+    QUERY_LIMITS maps "View.action", "View" or "default" to a dict of
+    statement_timeout and db_time in ms and max_queries, 0 disabling one.
+    """
+    limits = {"statement_timeout": settings.STATEMENT_TIMEOUT}
+    limits.update(settings.QUERY_LIMITS.get("default", {}))
+    limits.update(settings.QUERY_LIMITS.get(label.split(".")[0], {}))
+    limits.update(settings.QUERY_LIMITS.get(label, {}))
+    return limits
+
+
+def execute_unobserved(sql, params=None):
+    """Execute a statement past the execute wrappers and query counters"""
+    connection.ensure_connection()
+    with connection.wrap_database_errors:
+        with connection.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def set_statement_timeout(statement_timeout):
+    """Set the statement timeout of the connection in ms, 0 disables it"""
+    execute_unobserved(
+        "SELECT set_config('statement_timeout', %s, false)",
+        [f"{statement_timeout}ms"]
+    )
+
+
+def reset_statement_timeout():
+    """Restore the STATEMENT_TIMEOUT the connection was opened with"""
+    try:
+        execute_unobserved("RESET statement_timeout")
+    except DatabaseError:
+        # A connection that cannot be reset must not serve other requests
+        connection.close()
+
+
+def is_statement_timeout(exception):
+    """Return whether an exception comes from a cancelled statement"""
+    cause = getattr(exception, "__cause__", None)
+    return getattr(cause, "pgcode", None) == QUERY_CANCELED
+
+
+class QueryBudget:
+    """connection.execute_wrapper hook enforcing a query and DB time budget
+
+    The budget is checked before each query, so the query that would go
+    over it is never sent.
+    """
+
+    def __init__(self):
+        self.max_queries = 0
+        self.max_db_time = 0
+        self.queries = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.max_queries and self.queries >= self.max_queries:
+            raise QueryBudgetExceeded(
+                f"More than {self.max_queries} queries"
+            )
+        if self.max_db_time and self.db_time >= self.max_db_time:
+            raise QueryBudgetExceeded(
+                f"More than {self.max_db_time}ms of queries"
+            )
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += (time.perf_counter() - started) * 1000
+
+
+def iter_within_budget(content, budget):
+    """Yield the chunks of a streamed response under a query budget
+
+    Streamed responses read their rows after the view returned, so the
+    budget is applied again while each chunk is produced.
+    """
+    chunks = iter(content)
+    while True:
+        with connection.execute_wrapper(budget):
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+        yield chunk
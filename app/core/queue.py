@@ -0,0 +1,295 @@
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, \
+     transaction
+from django.db.models import Avg, Count, F, Min
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 3600
+# Outcome of an attempt that lost its lease to another worker
+LOST = "lost"
+
+_registry = {}
+
+
+def task(name, max_attempts=3):
+    """Register a function as the task called name
+
+    The function is called with the task payload as keyword arguments.
+    """
+    def register(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        _registry[name] = func
+        return func
+
+    return register
+
+
+def autodiscover():
+    """Import the tasks module of every installed app"""
+    autodiscover_modules("tasks")
+
+
+def enqueue(name, payload=None, dedup_key=None, run_at=None,
+            max_attempts=None):
+    """Queue a task, or return the pending task already queued under key
+
+    Runs in the caller's transaction, so the task only becomes visible to
+    workers once the write that asked for it commits.
+    """
+    func = _registry.get(name)
+    if max_attempts is None:
+        max_attempts = getattr(func, "max_attempts", 3)
+    while True:
+        try:
+            with transaction.atomic():
+                return Task.objects.create(
+                    name=name,
+                    payload=payload or {},
+                    dedup_key=dedup_key,
+                    run_at=run_at or timezone.now(),
+                    max_attempts=max_attempts
+                )
+        except IntegrityError:
+            if dedup_key is None:
+                raise
+        pending = Task.objects.filter(
+            dedup_key=dedup_key,
+            status=Task.PENDING
+        ).first()
+        # Claimed between the insert and the lookup, so insert again
+        if pending is not None:
+            return pending
+
+
+def claim(limit=1):
+    """Mark up to limit due tasks as running and return them
+
+    Rows locked by other workers are skipped, and running tasks whose lease
+    expired, because their worker died and stopped renewing it, are claimed
+    again.
+    """
+    table = Task._meta.db_table
+    # Python time, the one run_at is written with
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} SET
+                status = %(running)s,
+                started_at = %(now)s,
+                heartbeat_at = %(now)s,
+                attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE (status = %(pending)s AND run_at <= %(now)s)
+                    OR (status = %(running)s AND heartbeat_at < %(expired)s)
+                ORDER BY run_at, id
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+            """,
+            {
+                "running": Task.RUNNING,
+                "pending": Task.PENDING,
+                "now": now,
+                "expired": now - timedelta(
+                    seconds=settings.TASK_LEASE_SECONDS
+                ),
+                "limit": limit,
+            }
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    return list(Task.objects.filter(id__in=ids).order_by("run_at", "id"))
+
+
+def get_attempt(claimed):
+    """Return the task row while the attempt claimed still holds it"""
+    return Task.objects.filter(
+        pk=claimed.pk,
+        attempts=claimed.attempts,
+        status=Task.RUNNING
+    )
+
+
+class Heartbeat:
+    """Thread renewing the lease of a claimed task while it runs"""
+
+    def __init__(self, claimed, interval):
+        self.claimed = claimed
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.beat, daemon=True)
+
+    def beat(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    get_attempt(self.claimed).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except DatabaseError:
+                    logger.warning(
+                        "task=%s id=%s lease not renewed",
+                        self.claimed.name, self.claimed.pk,
+                        exc_info=True
+                    )
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+
+def get_retry_delay(attempts):
+    """Return the seconds to wait before another attempt"""
+    return min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+        MAX_RETRY_DELAY
+    )
+
+
+def retry(claimed, run_at, error):
+    """Put a failed task back in the queue, returning the task that retries
+
+    When the same key was queued while the task ran, the pending task takes
+    over its attempts and backoff, and the failed one is marked failed.
+    Returns None when the attempt lost its lease to another worker.
+    """
+    while True:
+        with transaction.atomic():
+            if not get_attempt(claimed).select_for_update().exists():
+                return None
+            pending = None
+            if claimed.dedup_key is not None:
+                pending = Task.objects.select_for_update().filter(
+                    dedup_key=claimed.dedup_key,
+                    status=Task.PENDING
+                ).exclude(pk=claimed.pk).first()
+            if pending is None:
+                try:
+                    with transaction.atomic():
+                        get_attempt(claimed).update(
+                            status=Task.PENDING,
+                            run_at=run_at,
+                            last_error=error
+                        )
+                    return claimed.pk
+                except IntegrityError:
+                    # The key was queued again after the lookup
+                    continue
+            Task.objects.filter(pk=pending.pk).update(
+                attempts=Greatest("attempts", claimed.attempts),
+                run_at=Greatest("run_at", run_at),
+                last_error=error
+            )
+            get_attempt(claimed).update(
+                status=Task.FAILED,
+                last_error=f"Superseded by task {pending.pk}\n{error}"
+            )
+            return pending.pk
+
+
+def run(claimed):
+    """Run a claimed task and record its outcome, returning it
+
+    The lease is renewed while the task runs. An attempt whose lease was
+    taken over by another worker anyway records nothing and returns LOST.
+    """
+    started = time.perf_counter()
+    func = _registry.get(claimed.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {claimed.name}")
+        with Heartbeat(claimed, settings.TASK_LEASE_SECONDS / 3):
+            func(**claimed.payload)
+    except Exception:
+        error = traceback.format_exc()
+        retried_by = None
+        if func is not None and claimed.attempts < claimed.max_attempts:
+            status = Task.PENDING
+            retried_by = retry(
+                claimed,
+                timezone.now() + timedelta(
+                    seconds=get_retry_delay(claimed.attempts)
+                ),
+                error
+            )
+            recorded = retried_by is not None
+        else:
+            status = Task.FAILED
+            recorded = get_attempt(claimed).update(
+                status=status,
+                last_error=error
+            )
+        if not recorded:
+            return lost(claimed, status)
+        logger.warning(
+            "task=%s id=%s attempt=%s status=%s retried_by=%s",
+            claimed.name, claimed.pk, claimed.attempts, status, retried_by,
+            exc_info=True
+        )
+        return status
+
+    if not get_attempt(claimed).update(
+        status=Task.DONE,
+        finished_at=timezone.now()
+    ):
+        return lost(claimed, Task.DONE)
+    logger.info(
+        "task=%s id=%s attempt=%s status=%s duration_ms=%.1f",
+        claimed.name, claimed.pk, claimed.attempts, Task.DONE,
+        (time.perf_counter() - started) * 1000
+    )
+    return Task.DONE
+
+
+def lost(claimed, status):
+    """Log an outcome not recorded since another attempt took the task"""
+    logger.warning(
+        "task=%s id=%s attempt=%s status=%s not recorded, lease lost",
+        claimed.name, claimed.pk, claimed.attempts, status
+    )
+    return LOST
+
+
+def get_metrics(window=300):
+    """Return the queue depth per status and the recent wait times"""
+    now = timezone.now()
+    depth = {status: 0 for status, _ in Task.STATUS_CHOICES}
+    depth.update(
+        Task.objects.values_list("status").annotate(count=Count("id"))
+    )
+    oldest = Task.objects.filter(
+        status=Task.PENDING,
+        run_at__lte=now
+    ).aggregate(run_at=Min("run_at"))["run_at"]
+    wait = Task.objects.filter(
+        started_at__gte=now - timedelta(seconds=window)
+    ).aggregate(wait=Avg(F("started_at") - F("run_at")))["wait"]
+
+    return {
+        "depth": depth,
+        "oldest_pending_seconds": (
+            (now - oldest).total_seconds() if oldest else 0.0
+        ),
+        "avg_wait_seconds": wait.total_seconds() if wait else 0.0,
+    }
@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.renderers import CoreJSONRenderer
+from rest_framework.schemas import SchemaGenerator
+from rest_framework_swagger.renderers import OpenAPICodec, \
+     OpenAPIRenderer, SwaggerUIRenderer
+from rest_framework_swagger.settings import swagger_settings
+from core.compression import choose_encoding
+
+logger = logging.getLogger(__name__)
+
+TITLE = "Recipes API"
+CONTENT_TYPES = {
+    "openapi": "application/openapi+json",
+    "corejson": "application/coreapi+json",
+}
+
+_lock = threading.Lock()
+_schema = None
+
+
+@lru_cache(maxsize=None)
+def get_code_version():
+    """Return CODE_VERSION, or a digest of the Python sources of the app"""
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                digest.update(
+                    f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+                )
+    return digest.hexdigest()[:16]
+
+
+class Schema:
+    """Encoded schema documents with their gzip encoding and ETag"""
+
+    def __init__(self, version, documents):
+        self.version = version
+        self.documents = documents
+        self.gzipped = {
+            key: gzip.compress(body) for key, body in documents.items()
+        }
+        self.etags = {
+            key: hashlib.sha1(body).hexdigest()[:20]
+            for key, body in documents.items()
+        }
+
+
+def build_documents():
+    """Generate the schema of every endpoint, encoded per format"""
+    document = SchemaGenerator(title=TITLE).get_schema(public=True)
+    return {
+        "openapi": OpenAPICodec().encode(
+            document,
+            **OpenAPIRenderer().get_customizations()
+        ),
+        "corejson": CoreJSONRenderer().render(document, renderer_context={}),
+    }
+
+
+def get_cache_path(version):
+    return os.path.join(settings.SCHEMA_CACHE_DIR, f"schema-{version}.json")
+
+
+def write_documents(version, documents):
+    """Store the documents of a code version on disk, return the path"""
+    path = get_cache_path(version)
+    os.makedirs(settings.SCHEMA_CACHE_DIR, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}"
+    with open(temporary, "w") as output:
+        json.dump(
+            {key: body.decode("utf-8") for key, body in documents.items()},
+            output
+        )
+    os.replace(temporary, path)
+    return path
+
+
+def read_documents(version):
+    """Return the documents stored for a code version, None when missing"""
+    try:
+        with open(get_cache_path(version)) as cached:
+            return {
+                key: body.encode("utf-8")
+                for key, body in json.load(cached).items()
+            }
+    except (OSError, ValueError):
+        return None
+
+
+def build_schema():
+    """Generate the schema, store it on disk and use it in this process"""
+    global _schema
+    version = get_code_version()
+    documents = build_documents()
+    path = write_documents(version, documents)
+    with _lock:
+        _schema = Schema(version, documents)
+    return path
+
+
+def get_schema():
+    """Return the schema of the running code from memory, disk or built"""
+    global _schema
+    version = get_code_version()
+    if _schema is not None and _schema.version == version:
+        return _schema
+    with _lock:
+        if _schema is None or _schema.version != version:
+            documents = read_documents(version)
+            if documents is None:
+                documents = build_documents()
+                try:
+                    write_documents(version, documents)
+                except OSError as error:
+                    logger.warning("Schema not cached on disk: %s", error)
+            _schema = Schema(version, documents)
+        return _schema
+
+
+def clear():
+    """Forget the schema and code version kept in memory"""
+    global _schema
+    with _lock:
+        _schema = None
+        get_code_version.cache_clear()
+
+
+def get_format(request):
+    """Pick the schema format like the swagger view negotiated it"""
+    requested = request.GET.get("format")
+    if requested:
+        return requested
+    accept = request.META.get("HTTP_ACCEPT", "")
+    if "text/html" in accept:
+        return "swagger"
+    if CONTENT_TYPES["openapi"] in accept:
+        return "openapi"
+    return "corejson"
+
+
+def schema_view(request):
+    """Serve the prebuilt schema, or the Swagger UI embedding it"""
+    schema = get_schema()
+    key = get_format(request)
+    if key == "swagger":
+        renderer = SwaggerUIRenderer()
+        return render(request, renderer.template, {
+            "USE_SESSION_AUTH": swagger_settings.USE_SESSION_AUTH,
+            "drs_settings": json.dumps(renderer.get_ui_settings()),
+            "spec": schema.documents["openapi"].decode("utf-8"),
+            **renderer.get_auth_urls(),
+        })
+    if key not in CONTENT_TYPES:
+        return HttpResponse(status=404)
+
+    gzipped = choose_encoding(
+        request.META.get("HTTP_ACCEPT_ENCODING", ""),
+        ["gzip"]
+    ) == "gzip"
+    etag = f'"{schema.etags[key]}{"-gzip" if gzipped else ""}"'
+    response = HttpResponse(
+        schema.gzipped[key] if gzipped else schema.documents[key],
+        content_type=CONTENT_TYPES[key]
+    )
+    if gzipped:
+        response["Content-Encoding"] = "gzip"
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, no-cache"
+    patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+    return get_conditional_response(request, etag=etag, response=response)
@@ -0,0 +1,222 @@
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import HttpResponseForbidden, JsonResponse
+from django.utils import timezone
+from core.profiling import get_staff_user
+
+logger = logging.getLogger("core.slow_queries")
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+ROW_LOCK = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b",
+    re.IGNORECASE
+)
+
+
+def fingerprint(sql):
+    """Return sql with literals and parameter lists replaced by ?
+
+    Queries differing only in their values, like tags__id__in lists of
+    any length, share a fingerprint.
+    """
+    sql = STRING.sub("?", sql)
+    sql = NUMBER.sub("?", sql.replace("%s", "?"))
+    sql = PLACEHOLDER_LIST.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+class SlowQueryLog:
+    """Ring buffer of the latest slow queries, shared by the threads"""
+
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+
+    def get_entries(self):
+        with self.lock:
+            return [dict(entry) for entry in self.entries]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_fingerprints(self):
+        """Return count, total and max duration per fingerprint, worst first"""
+        summaries = {}
+        for entry in self.get_entries():
+            summary = summaries.setdefault(entry["fingerprint"], {
+                "fingerprint": entry["fingerprint"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "views": set(),
+            })
+            summary["count"] += 1
+            summary["total_ms"] += entry["duration_ms"]
+            summary["max_ms"] = max(summary["max_ms"], entry["duration_ms"])
+            summary["views"].add(entry["view"])
+        return sorted(
+            (
+                {**summary, "total_ms": round(summary["total_ms"], 1),
+                 "views": sorted(summary["views"])}
+                for summary in summaries.values()
+            ),
+            key=lambda summary: summary["total_ms"],
+            reverse=True
+        )
+
+
+log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
+
+
+def is_explainable(sql):
+    """Return whether EXPLAIN ANALYZE may run a statement again
+
+    ANALYZE executes the statement, so only SELECTs taking no row locks
+    are explained, locks the request holds would block them otherwise.
+    """
+    return sql.lstrip().upper().startswith("SELECT") and \
+        not ROW_LOCK.search(sql)
+
+
+def explain(sql, params):
+    """Return the EXPLAIN (ANALYZE, BUFFERS) plan of a query
+
+    The plan is taken on the connection of the calling thread, outside the
+    transaction of the request, so the query cannot see its writes.
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('statement_timeout', %s, false)",
+                [str(settings.SLOW_QUERY_EXPLAIN_TIMEOUT)]
+            )
+            cursor.execute(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}",
+                params
+            )
+            plan = cursor.fetchone()[0]
+    except DatabaseError as error:
+        return {"error": str(error).strip()}
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+class Explainer:
+    """Thread explaining slow queries after the requests that ran them
+
+    Queries waiting beyond SLOW_QUERY_EXPLAIN_QUEUE are dropped, so a burst
+    of slow queries never piles EXPLAIN ANALYZE runs on the database.
+    """
+
+    def __init__(self, size):
+        self.queue = queue.Queue(maxsize=size)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, entry, sql, params):
+        """Queue a logged entry to get the plan of its query"""
+        try:
+            self.queue.put_nowait((entry, sql, params))
+        except queue.Full:
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            entry, sql, params = self.queue.get()
+            try:
+                plan = explain(sql, params)
+                with log.lock:
+                    entry["plan"] = plan
+                logger.warning(
+                    "slow query plan view=%s fingerprint=%s plan=%s",
+                    entry["view"],
+                    entry["fingerprint"],
+                    json.dumps(plan)
+                )
+            finally:
+                if self.queue.empty():
+                    # Do not hold a connection while idle
+                    connection.close()
+                self.queue.task_done()
+
+    def wait(self):
+        """Block until every queued query is explained"""
+        self.queue.join()
+
+
+explainer = Explainer(settings.SLOW_QUERY_EXPLAIN_QUEUE)
+
+
+class SlowQueryRecorder:
+    """connection.execute_wrapper hook logging queries over the threshold"""
+
+    def __init__(self, threshold, explain_rate):
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.view = "unknown"
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = execute(sql, params, many, context)
+            failed = False
+            return result
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= self.threshold:
+                self.record(sql, params, many, duration, failed)
+
+    def record(self, sql, params, many, duration, failed=False):
+        """Log a slow query, its plan is taken later by the explainer
+
+        Statements that failed, like those cancelled by a statement
+        timeout, are not explained.
+        """
+        entry = {
+            "at": timezone.now().isoformat(),
+            "duration_ms": round(duration, 1),
+            "view": self.view,
+            "fingerprint": fingerprint(sql),
+            "sql": sql,
+            "plan": None,
+        }
+        log.add(entry)
+        logger.warning(
+            "slow query view=%s duration_ms=%.1f fingerprint=%s",
+            entry["view"],
+            entry["duration_ms"],
+            entry["fingerprint"]
+        )
+        if not many and not failed and is_explainable(sql) and \
+                random.random() < self.explain_rate:
+            explainer.submit(entry, sql, params)
+
+
+def slow_queries_view(request):
+    """List the latest slow queries and their fingerprints, staff only"""
+    if not request.user.is_staff and get_staff_user(request) is None:
+        return HttpResponseForbidden()
+    return JsonResponse({
+        "fingerprints": log.get_fingerprints(),
+        "queries": log.get_entries()[::-1],
+    })
@@ -0,0 +1,64 @@
+from django.http import StreamingHttpResponse
+from rest_framework.compat import SHORT_SEPARATORS, LONG_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """Renderer encoding a list of items incrementally into JSON chunks
+
+    Selected with ?format=json-stream. Views that support streaming hand it
+    an iterable through iter_render, anything else (errors, single objects)
+    is rendered at once like JSONRenderer does.
+    """
+    format = "json-stream"
+    chunk_size = 64 * 1024
+
+    def get_separators(self):
+        """Return the separators JSONRenderer.render uses without indent"""
+        return SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+
+    def get_encoder(self):
+        """Return a JSON encoder configured like JSONRenderer.render"""
+        return self.encoder_class(
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            separators=self.get_separators()
+        )
+
+    def encode(self, encoder, item):
+        """Encode a single item to bytes"""
+        ret = encoder.encode(item)
+        ret = ret.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+        return ret.encode("utf-8")
+
+    def iter_render(self, items):
+        """Yield a JSON array of items as chunks of about chunk_size bytes"""
+        encoder = self.get_encoder()
+        separator = self.get_separators()[0].encode("utf-8")
+        buffer = [b"["]
+        size = 1
+        for index, item in enumerate(items):
+            if index:
+                buffer.append(separator)
+                size += len(separator)
+            encoded = self.encode(encoder, item)
+            buffer.append(encoded)
+            size += len(encoded)
+            if size >= self.chunk_size:
+                yield b"".join(buffer)
+                buffer = []
+                size = 0
+        buffer.append(b"]")
+        yield b"".join(buffer)
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """Response sending the chunks of a StreamingJSONRenderer to the server"""
+
+    def __init__(self, items, renderer=None, status=None):
+        renderer = renderer or StreamingJSONRenderer()
+        super().__init__(
+            renderer.iter_render(items),
+            content_type=renderer.media_type,
+            status=status
+        )
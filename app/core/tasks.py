@@ -0,0 +1,21 @@
+from django.db.utils import OperationalError
+from core.deletion import purge_user
+from core.models import AccountDeletion
+from core.queue import task
+
+
+@task("purge_account", max_attempts=10)
+def purge_account(deletion_id):
+    """Purge the data of a deactivated user"""
+    deletion = AccountDeletion.objects.filter(pk=deletion_id).first()
+    # Dropped when the user was reactivated
+    if deletion is None or deletion.finished_at is not None:
+        return
+    try:
+        purge_user(deletion)
+    except OperationalError as error:
+        # Typically a lock timeout, the retry resumes the purge
+        AccountDeletion.objects.filter(pk=deletion.pk).update(
+            last_error=str(error)
+        )
+        raise
@@ -1,6 +1,11 @@
-from django.test import TestCase, Client
+from unittest.mock import patch
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
+from core.admin import EstimatedCountPaginator
+from core.models import AccountDeletion, Recipe, Tag
 
 
 class AdminSiteTests(TestCase):
@@ -39,3 +44,85 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_delete_user_deactivates(self):
+        """Test deleting a user from the admin queues the purge"""
+        url = reverse("admin:core_user_delete", args=[self.user.id])
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+
+        self.client.post(url, {"post": "yes"})
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(
+            AccountDeletion.objects.filter(user_id=self.user.id).exists()
+        )
+
+    def test_recipe_change_page_autocompletes(self):
+        """Test the recipe form does not list every tag and ingredient"""
+        tag = Tag.objects.create(user=self.user, name="Selected")
+        Tag.objects.create(user=self.user, name="Other")
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Recipe",
+            time_minutes=5,
+            price=5
+        )
+        recipe.tags.add(tag)
+        url = reverse("admin:core_recipe_change", args=[recipe.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, "admin-autocomplete")
+        self.assertContains(res, "Selected")
+        self.assertNotContains(res, "Other")
+
+    def test_recipes_listed_with_users(self):
+        """Test the recipe changelist loads the users in the same query"""
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {i}",
+                time_minutes=5,
+                price=5
+            )
+        url = reverse("admin:core_recipe_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+
+        self.assertContains(res, "Recipe 2")
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "core_user"')
+            and '"core_user"."id" = ' in query["sql"]
+            and str(self.user.id) in query["sql"]
+        ])
+
+    def test_users_searched_by_prefix(self):
+        """Test users are searched by email and name prefix"""
+        url = reverse("admin:core_user_changelist")
+        res = self.client.get(url, {"q": "EMAIL@"})
+
+        self.assertContains(
+            res,
+            reverse("admin:core_user_change", args=[self.user.id])
+        )
+        self.assertNotContains(
+            res,
+            reverse("admin:core_user_change", args=[self.admin_user.id])
+        )
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+    def test_estimated_count(self):
+        """Test unfiltered changelists use the planner row estimate"""
+        users = get_user_model().objects.order_by("id")
+        with patch("core.admin.get_estimated_count", return_value=12345):
+            paginator = EstimatedCountPaginator(users, 100)
+            filtered = EstimatedCountPaginator(
+                users.filter(id=self.user.id),
+                100
+            )
+
+            self.assertEqual(paginator.count, 12345)
+            self.assertEqual(filtered.count, 1)
@@ -1,7 +1,13 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import LiveServerTestCase, TestCase, override_settings
 
 
 class CommandTests(TestCase):
@@ -19,3 +25,116 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command("wait_for_db")
             self.assertEqual(gi.call_count, 6)
+
+    def test_benchmark(self):
+        """Test the benchmark reports every endpoint without errors"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            call_command(
+                "benchmark",
+                sizes=[2],
+                iterations=2,
+                warmup=0,
+                output=output,
+                stdout=StringIO()
+            )
+            with open(output) as results:
+                results = json.load(results)["results"]
+
+            self.assertIn("recipe-list@2", results)
+            self.assertIn("user-token@2", results)
+            for result in results.values():
+                self.assertEqual(result["errors"], 0)
+                self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+            for result in results.values():
+                result["p95_ms"] = 0.0
+            with open(output, "w") as baseline:
+                json.dump({"results": results}, baseline)
+            with self.assertRaises(CommandError):
+                call_command(
+                    "benchmark",
+                    sizes=[2],
+                    iterations=2,
+                    warmup=0,
+                    baseline=output,
+                    stdout=StringIO(),
+                    stderr=StringIO()
+                )
+
+    def test_benchmark_compression(self):
+        """Test the compression benchmark reports every payload"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            call_command(
+                "benchmark_compression",
+                sizes=[2],
+                iterations=1,
+                output=output,
+                stdout=StringIO(),
+                stderr=StringIO()
+            )
+            with open(output) as results:
+                results = json.load(results)["results"]
+
+        payloads = {result["payload"] for result in results}
+        self.assertIn("recipe-list@2", payloads)
+        self.assertIn("recipe-list-stream@2", payloads)
+        for result in results:
+            self.assertGreater(result["raw_bytes"], 0)
+            self.assertGreater(result["compressed_bytes"], 0)
+
+    def test_benchmark_middleware(self):
+        """Test the middleware benchmark times both stacks"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            call_command(
+                "benchmark_middleware",
+                iterations=2,
+                rounds=1,
+                output=output,
+                stdout=StringIO()
+            )
+            with open(output) as results:
+                results = json.load(results)["results"]
+
+        self.assertEqual(
+            set(results),
+            {"user-me@full", "user-me@lean", "recipe-list@full",
+             "recipe-list@lean"}
+        )
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def test_loadtest(self):
+        """Test the load test replays the mix against a live server"""
+        get_user_model().objects.create_user(
+            email="seed-load@mysimpleapplication.com",
+            password="seed-password",
+            name="Load"
+        )
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(MEDIA_ROOT=directory):
+            output = os.path.join(directory, "results.json")
+            call_command(
+                "loadtest",
+                url=self.live_server_url,
+                stages=[2],
+                duration=1,
+                interval=0.5,
+                mix="login=1,list=2,detail=2,create=1,upload=1",
+                output=output,
+                stdout=StringIO()
+            )
+            with open(output) as results:
+                stage = json.load(results)["stages"][0]
+
+        self.assertEqual(stage["concurrency"], 2)
+        self.assertGreater(stage["requests"], 0)
+        self.assertEqual(stage["error_rate"], 0)
+        self.assertIn("list", stage["operations"])
+
+    def test_loadtest_without_users(self):
+        """Test the load test fails when there is nobody to log in as"""
+        with self.assertRaises(CommandError):
+            call_command("loadtest", url=self.live_server_url)
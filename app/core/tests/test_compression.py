@@ -0,0 +1,94 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import compression
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class CompressionTests(TestCase):
+    """Test the response compression"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                title=f"Recipe {i}",
+                time_minutes=10,
+                price=5
+            )
+            for i in range(30)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_choose_encoding(self):
+        """Test the preferred encoding the client accepts is chosen"""
+        encodings = ["zstd", "br", "gzip"]
+
+        self.assertEqual(
+            compression.choose_encoding("gzip, deflate, br", encodings),
+            "br"
+        )
+        self.assertEqual(
+            compression.choose_encoding("br;q=0, gzip;q=0.5", encodings),
+            "gzip"
+        )
+        self.assertEqual(compression.choose_encoding("*", encodings), "zstd")
+        self.assertIsNone(compression.choose_encoding("identity", encodings))
+        self.assertIsNone(compression.choose_encoding("", encodings))
+
+    def test_is_compressible(self):
+        """Test text types are compressed and compressed media is not"""
+        for content_type in ("application/json", "text/html; charset=utf-8",
+                             "application/openapi+json", "image/svg+xml"):
+            self.assertTrue(compression.is_compressible(content_type))
+        for content_type in ("image/jpeg", "application/zip", "video/mp4",
+                             "application/octet-stream", None):
+            self.assertFalse(compression.is_compressible(content_type))
+
+    @override_settings(COMPRESSION_ENCODINGS=["gzip"])
+    def test_response_compressed(self):
+        """Test large JSON responses are gzipped for clients accepting it"""
+        plain = self.client.get(RECIPES_URL)
+        response = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(
+            int(response["Content-Length"]),
+            len(response.content)
+        )
+
+    @override_settings(COMPRESSION_MIN_SIZE=1024 * 1024)
+    def test_small_response_not_compressed(self):
+        """Test bodies under the minimum size are sent as is"""
+        response = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(len(json.loads(response.content)), 30)
+
+    @override_settings(COMPRESSION_ENCODINGS=["gzip"])
+    def test_streaming_response_compressed(self):
+        """Test streamed responses are compressed chunk by chunk"""
+        response = self.client.get(
+            RECIPES_URL,
+            {"format": "json-stream"},
+            HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        content = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(len(json.loads(content)), 30)
@@ -0,0 +1,113 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from core import deletion as deletion_module, models
+from core.deletion import request_deletion, purge_user
+
+
+def create_user(email):
+    """Creates and return a user"""
+    return get_user_model().objects.create_user(email, "test-password")
+
+
+def create_library(user, size):
+    """Creates recipes sharing a tag and an ingredient for a user"""
+    tag = models.Tag.objects.create(user=user, name="Vegan")
+    ingredient = models.Ingredient.objects.create(user=user, name="Tofu")
+    for i in range(size):
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title=f"Recipe {i}",
+            time_minutes=10,
+            price=5
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+
+class AccountDeletionTests(TestCase):
+    """Test the batched purge of deactivated users"""
+
+    def setUp(self):
+        self.user = create_user("user@mysimpleapplication.com")
+        self.other = create_user("other@mysimpleapplication.com")
+        create_library(self.user, 5)
+        create_library(self.other, 1)
+
+    def test_purge_in_batches(self):
+        """Test the purge deletes every row of the user and tracks it"""
+        deletion = request_deletion(self.user)
+
+        call_command("purge_deleted_users", batch_size=2)
+
+        deletion.refresh_from_db()
+        self.assertIsNotNone(deletion.finished_at)
+        self.assertEqual(deletion.recipes_deleted, 5)
+        self.assertEqual(deletion.tags_deleted, 1)
+        self.assertEqual(deletion.ingredients_deleted, 1)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(models.Recipe.objects.count(), 1)
+        self.assertEqual(models.Recipe.tags.through.objects.count(), 1)
+        self.assertEqual(models.RecipeSignature.objects.count(), 1)
+        self.assertEqual(models.TagUsage.objects.count(), 1)
+
+    def test_reactivated_user_not_purged(self):
+        """Test a user reactivated before the purge keeps the data"""
+        deletion = request_deletion(self.user)
+        self.user.is_active = True
+        self.user.save()
+
+        self.assertFalse(purge_user(deletion))
+        self.assertEqual(models.Recipe.objects.count(), 6)
+        self.assertFalse(
+            models.AccountDeletion.objects.filter(pk=deletion.pk).exists()
+        )
+
+        call_command("purge_deleted_users", stdout=StringIO())
+        call_command("run_worker", threads=1, once=True, stdout=StringIO())
+        self.assertEqual(models.Recipe.objects.count(), 6)
+        self.assertEqual(models.Task.objects.get().status, models.Task.DONE)
+
+    def test_reactivated_during_purge(self):
+        """Test a user reactivated between two batches keeps the rest"""
+        deletion = request_deletion(self.user)
+        delete_batch = deletion_module.delete_batch
+
+        def reactivate_after_batch(*args):
+            deleted = delete_batch(*args)
+            get_user_model().objects.filter(pk=self.user.pk).update(
+                is_active=True
+            )
+            return deleted
+
+        with patch.object(
+            deletion_module, "delete_batch", reactivate_after_batch
+        ):
+            self.assertFalse(purge_user(deletion, batch_size=2))
+
+        self.assertTrue(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertEqual(
+            models.Recipe.objects.filter(user=self.user).count(),
+            3
+        )
+        self.assertFalse(
+            models.AccountDeletion.objects.filter(pk=deletion.pk).exists()
+        )
+
+    def test_purge_task_queued(self):
+        """Test requesting a deletion queues its purge as a task"""
+        deletion = request_deletion(self.user)
+        request_deletion(self.user)
+
+        call_command("run_worker", threads=1, once=True)
+
+        deletion.refresh_from_db()
+        self.assertIsNotNone(deletion.finished_at)
+        self.assertEqual(models.Task.objects.get().status, models.Task.DONE)
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+METRICS_URL = reverse("metrics")
+RECIPES_URL = reverse("recipe:recipe-list")
+TOKEN_URL = reverse("user:token")
+
+
+def get_sample(name, **labels):
+    """Return the current value of a metric sample, 0 when unset"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    """Test the Prometheus metrics endpoint"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+        self.client = APIClient()
+
+    def test_request_metrics(self):
+        """Test requests are counted per route, method and status"""
+        labels = {
+            "route": "recipe:recipe-list",
+            "method": "GET",
+            "status": "200"
+        }
+        before = get_sample("http_request_duration_seconds_count", **labels)
+        self.client.force_authenticate(self.user)
+
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            get_sample("http_request_duration_seconds_count", **labels),
+            before + 1
+        )
+        self.user.is_staff = True
+        self.user.save()
+        token = Token.objects.create(user=self.user)
+        response = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request_db_queries_bucket", response.content)
+        self.assertIn(b"http_requests_in_flight", response.content)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_restricted(self):
+        """Test only the scrape token and staff users read the metrics"""
+        response = self.client.get(METRICS_URL)
+        self.assertEqual(response.status_code, 403)
+
+        token = Token.objects.create(user=self.user)
+        response = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_attempts_counted(self):
+        """Test token logins are counted by result"""
+        failures = get_sample("auth_login_attempts_total", result="failure")
+        successes = get_sample("auth_login_attempts_total", result="success")
+
+        self.client.post(TOKEN_URL, {
+            "email": "user@mysimpleapplication.com",
+            "password": "wrong"
+        })
+        self.client.post(TOKEN_URL, {
+            "email": "user@mysimpleapplication.com",
+            "password": "test-password"
+        })
+
+        self.assertEqual(
+            get_sample("auth_login_attempts_total", result="failure"),
+            failures + 1
+        )
+        self.assertEqual(
+            get_sample("auth_login_attempts_total", result="success"),
+            successes + 1
+        )
@@ -0,0 +1,142 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.checks import run_checks
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import checks, timing
+from core.middleware import WebAuthenticationMiddleware, \
+     WebCsrfViewMiddleware, WebSessionMiddleware
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+ANALYTICS_URL = reverse("recipe:analytics")
+ME_URL = reverse("user:me")
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    """Test the per request timing instrumentation"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title="Recipe",
+            time_minutes=10,
+            price=5
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request_timed(self):
+        """Test sampled requests get a Server-Timing header and log line"""
+        with self.assertLogs("core.timing", "INFO") as logs:
+            response = self.client.get(RECIPES_URL)
+
+        metrics = [
+            metric.split(";")[0]
+            for metric in response["Server-Timing"].split(", ")
+        ]
+        self.assertEqual(metrics, ["db", "view", "render", "total"])
+        self.assertIn('desc="3 queries"', response["Server-Timing"])
+        self.assertIn("view=RecipeViewSet.list", logs.output[0])
+        self.assertIsNone(timing.current())
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_view_timed_for_every_view(self):
+        """Test every view reports the time spent outside queries"""
+        for url in (TAGS_URL, ME_URL, ANALYTICS_URL):
+            with self.assertLogs("core.timing", "INFO") as logs:
+                response = self.client.get(url)
+
+            self.assertIn("view;dur=", response["Server-Timing"])
+            self.assertIn("view_ms=", logs.output[0])
+
+    def test_timing_logged_at_info(self):
+        """Test the configured logging writes the per request lines"""
+        logger = logging.getLogger("core.timing")
+
+        self.assertTrue(logger.isEnabledFor(logging.INFO))
+        self.assertTrue(logger.handlers)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_not_timed(self):
+        """Test requests are not timed when sampling is off"""
+        response = self.client.get(RECIPES_URL)
+
+        self.assertNotIn("Server-Timing", response)
+
+
+class WebOnlyMiddlewareTests(TestCase):
+    """Test the API routes skip the session based middleware"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get_request(self, path):
+        """Run a request through the session and auth middleware"""
+        seen = {}
+
+        def get_response(request):
+            seen["request"] = request
+            return HttpResponse()
+
+        WebSessionMiddleware(WebAuthenticationMiddleware(get_response))(
+            self.factory.get(path)
+        )
+        return seen["request"]
+
+    def test_api_skips_session_and_auth(self):
+        """Test API requests get no session or session based user"""
+        api = self.get_request("/api/recipes/recipes/")
+        admin = self.get_request("/admin/")
+
+        self.assertFalse(hasattr(api, "session"))
+        self.assertFalse(hasattr(api, "user"))
+        self.assertTrue(hasattr(admin, "session"))
+        self.assertTrue(hasattr(admin, "user"))
+
+    def test_api_skips_csrf(self):
+        """Test unsafe API requests are not CSRF checked"""
+        middleware = WebCsrfViewMiddleware(lambda request: HttpResponse())
+
+        def view(request):
+            return HttpResponse()
+
+        api = self.factory.post("/api/recipes/recipes/")
+        admin = self.factory.post("/admin/")
+
+        self.assertIsNone(middleware.process_view(api, view, (), {}))
+        self.assertEqual(
+            middleware.process_view(admin, view, (), {}).status_code,
+            403
+        )
+
+    def test_csrf_check(self):
+        """Test the deploy checks see the CSRF middleware subclass"""
+        ids = [
+            message.id
+            for message in run_checks(include_deployment_checks=True)
+            if not message.is_silenced()
+        ]
+
+        self.assertNotIn("security.W003", ids)
+        self.assertNotIn("core.W001", ids)
+        self.assertEqual(checks.check_csrf_middleware(None), [])
+
+        middleware = [
+            name for name in settings.MIDDLEWARE
+            if name != "core.middleware.WebCsrfViewMiddleware"
+        ]
+        with override_settings(MIDDLEWARE=middleware):
+            messages = checks.check_csrf_middleware(None)
+
+        self.assertEqual([message.id for message in messages], ["core.W001"])
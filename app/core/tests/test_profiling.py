@@ -0,0 +1,135 @@
+import os
+import pstats
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core import profiling
+from core.models import RateLimit
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Test the opt-in request profiler"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(
+            PROFILING_ROOT=self.root,
+            PROFILING_SAMPLE_INTERVAL=0.001
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.staff = get_user_model().objects.create_user(
+            email="staff@mysimpleapplication.com",
+            password="test-password",
+            is_staff=True
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+
+    def get_client(self, user):
+        client = APIClient()
+        token = Token.objects.create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    def test_staff_request_profiled(self):
+        """Test a staff token gets its request profiled with cProfile"""
+        client = self.get_client(self.staff)
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")
+
+        self.assertEqual(response.status_code, 200)
+        name = response["X-Profile"]
+        self.assertTrue(name.endswith(".prof"))
+        stats = pstats.Stats(os.path.join(self.root, name))
+        self.assertTrue(stats.total_calls)
+
+    def test_sampling_profiler(self):
+        """Test the sampling profiler writes collapsed stacks"""
+        client = self.get_client(self.staff)
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="sample")
+
+        name = response["X-Profile"]
+        self.assertTrue(name.endswith(".collapsed"))
+        with open(os.path.join(self.root, name)) as output:
+            for line in output:
+                stack, count = line.rsplit(" ", 1)
+                self.assertGreater(int(count), 0)
+
+    def test_user_request_not_profiled(self):
+        """Test the header is ignored for users that are not staff"""
+        client = self.get_client(self.user)
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile", response)
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_signed_header_profiled(self):
+        """Test a signed header profiles the request of any user"""
+        client = self.get_client(self.user)
+        response = client.get(
+            RECIPES_URL,
+            HTTP_X_PROFILE=profiling.sign_mode("cprofile")
+        )
+        self.assertTrue(response["X-Profile"].endswith(".prof"))
+
+        RateLimit.objects.all().delete()
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile:forged")
+        self.assertNotIn("X-Profile", response)
+
+    def test_profiles_rate_limited(self):
+        """Test only one request is profiled per interval"""
+        client = self.get_client(self.staff)
+        client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Profile"], "rate-limited")
+        self.assertEqual(len(os.listdir(self.root)), 1)
+
+    def test_rate_limit_shared(self):
+        """Test a slot taken by another process is honoured until it frees"""
+        RateLimit.objects.create(
+            name=profiling.RATE_LIMIT_KEY,
+            acquired_at=timezone.now()
+        )
+        client = self.get_client(self.staff)
+        cache.clear()
+
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response["X-Profile"], "rate-limited")
+
+        RateLimit.objects.update(
+            acquired_at=timezone.now() - timedelta(minutes=2)
+        )
+        response = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")
+        self.assertTrue(response["X-Profile"].endswith(".prof"))
+
+    def test_download_profile(self):
+        """Test staff can download a profile and other users cannot"""
+        client = self.get_client(self.staff)
+        name = client.get(RECIPES_URL, HTTP_X_PROFILE="cprofile")["X-Profile"]
+        url = reverse("profile", args=[name])
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.getvalue())
+
+        response = self.get_client(self.user).get(url)
+        self.assertEqual(response.status_code, 403)
+        response = client.get(reverse("profile", args=["settings.py"]))
+        self.assertEqual(response.status_code, 404)
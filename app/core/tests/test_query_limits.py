@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core import query_limits
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TIMEOUT_LIMITS = {"RecipeViewSet": {"statement_timeout": 50}}
+
+
+def get_statement_timeout():
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW statement_timeout")
+        return cursor.fetchone()[0]
+
+
+class SlowReader:
+    """Reader taking longer than any statement timeout of the tests"""
+
+    def serialize(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_sleep(1)")
+        return []
+
+
+class QueryLimitTests(TestCase):
+    """Test the per view query budgets"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title="Recipe",
+            time_minutes=10,
+            price=5
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(STATEMENT_TIMEOUT=0, QUERY_LIMITS={
+        "default": {"max_queries": 10},
+        "RecipeViewSet": {"statement_timeout": 100, "max_queries": 20},
+        "RecipeViewSet.list": {"db_time": 50},
+    })
+    def test_get_limits(self):
+        """Test the limits of an action fall back to its view and default"""
+        self.assertEqual(query_limits.get_limits("RecipeViewSet.list"), {
+            "statement_timeout": 100,
+            "max_queries": 20,
+            "db_time": 50,
+        })
+        self.assertEqual(query_limits.get_limits("TagViewSet.list"), {
+            "statement_timeout": 0,
+            "max_queries": 10,
+        })
+
+    @override_settings(QUERY_LIMITS={"RecipeViewSet": {"max_queries": 1}})
+    def test_query_budget_exceeded(self):
+        """Test a request over its query budget gets a 503"""
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertIn("query budget", response.json()["detail"])
+
+    @override_settings(QUERY_LIMITS={"RecipeViewSet": {"max_queries": 1}})
+    def test_query_budget_applied_while_streaming(self):
+        """Test the rows read by a streamed response count in its budget"""
+        response = self.client.get(RECIPES_URL, {"format": "json-stream"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertRaises(query_limits.QueryBudgetExceeded):
+            b"".join(response.streaming_content)
+
+    @override_settings(QUERY_LIMITS={"RecipeViewSet": {"max_queries": 10}})
+    def test_query_budget_respected(self):
+        """Test a request within its budget is served"""
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class StatementTimeoutTests(TransactionTestCase):
+    """Test the per view statement timeouts"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(QUERY_LIMITS=TIMEOUT_LIMITS)
+    @patch("recipe.readers.get_reader", return_value=SlowReader())
+    def test_statement_timeout(self, get_reader):
+        """Test a statement over the view timeout is cancelled with a 503"""
+        default = get_statement_timeout()
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertIn("statement timeout", response.json()["detail"])
+        self.assertEqual(get_statement_timeout(), default)
+
+    @override_settings(QUERY_LIMITS=TIMEOUT_LIMITS)
+    def test_statement_timeout_reset(self):
+        """Test the view timeout does not outlive its request"""
+        default = get_statement_timeout()
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_statement_timeout(), default)
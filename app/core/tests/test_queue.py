@@ -0,0 +1,184 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from core import queue
+from core.models import Task
+
+calls = []
+
+
+@queue.task("test_record")
+def record(value):
+    calls.append(value)
+
+
+@queue.task("test_fail", max_attempts=2)
+def fail():
+    raise ValueError("Failed")
+
+
+@queue.task("test_outlive_lease")
+def outlive_lease(seconds):
+    time.sleep(seconds)
+    # Another worker would claim the task now if its lease was not renewed
+    calls.append(queue.claim())
+
+
+class TaskQueueTests(TestCase):
+    """Test the database backed task queue"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_worker(self):
+        """Test the worker runs the due tasks once each"""
+        first = queue.enqueue("test_record", {"value": 1})
+        queue.enqueue("test_record", {"value": 2})
+        queue.enqueue(
+            "test_record",
+            {"value": 3},
+            run_at=timezone.now() + timedelta(hours=1)
+        )
+
+        call_command("run_worker", threads=1, once=True)
+
+        self.assertEqual(calls, [1, 2])
+        first.refresh_from_db()
+        self.assertEqual(first.status, Task.DONE)
+        self.assertEqual(first.attempts, 1)
+
+    def test_dedup_key(self):
+        """Test a pending task is queued once per key"""
+        first = queue.enqueue("test_record", {"value": 1}, dedup_key="key")
+        second = queue.enqueue("test_record", {"value": 2}, dedup_key="key")
+
+        self.assertEqual(first.pk, second.pk)
+        queue.run(queue.claim()[0])
+        third = queue.enqueue("test_record", {"value": 3}, dedup_key="key")
+        self.assertNotEqual(first.pk, third.pk)
+
+    def test_enqueue_while_pending_claimed(self):
+        """Test a key whose pending task was claimed meanwhile is queued"""
+        first = queue.enqueue("test_record", {"value": 1}, dedup_key="key")
+        queue.claim()
+        create = Task.objects.create
+        calls = []
+
+        def create_after_conflict(**fields):
+            calls.append(fields)
+            if len(calls) == 1:
+                # The insert conflicted before a worker claimed the task
+                raise IntegrityError("core_task_pending_dedup_key")
+            return create(**fields)
+
+        with patch.object(Task.objects, "create", create_after_conflict):
+            second = queue.enqueue(
+                "test_record",
+                {"value": 2},
+                dedup_key="key"
+            )
+
+        self.assertEqual(len(calls), 2)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.status, Task.PENDING)
+
+    def test_retry_merged_into_pending(self):
+        """Test a failed task queued again while running is not retried"""
+        queue.enqueue("test_fail", dedup_key="key")
+        running = queue.claim()[0]
+        pending = queue.enqueue("test_fail", dedup_key="key")
+        self.assertNotEqual(running.pk, pending.pk)
+
+        with self.assertLogs("core.queue", "WARNING"):
+            self.assertEqual(queue.run(running), Task.PENDING)
+
+        running.refresh_from_db()
+        self.assertEqual(running.status, Task.FAILED)
+        self.assertIn(f"Superseded by task {pending.pk}", running.last_error)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, Task.PENDING)
+        self.assertEqual(pending.attempts, 1)
+        self.assertGreater(pending.run_at, timezone.now())
+
+    def test_retry_with_backoff(self):
+        """Test a failing task is retried later, then marked failed"""
+        task = queue.enqueue("test_fail")
+
+        with self.assertLogs("core.queue", "WARNING"):
+            self.assertEqual(queue.run(queue.claim()[0]), Task.PENDING)
+        task.refresh_from_db()
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn("ValueError", task.last_error)
+        self.assertEqual(queue.claim(), [])
+
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        with self.assertLogs("core.queue", "WARNING"):
+            self.assertEqual(queue.run(queue.claim()[0]), Task.FAILED)
+
+    def test_expired_lease_reclaimed(self):
+        """Test a task abandoned by a dead worker is claimed again"""
+        task = queue.enqueue("test_record", {"value": 1})
+        queue.claim()
+        self.assertEqual(queue.claim(), [])
+
+        Task.objects.filter(pk=task.pk).update(
+            heartbeat_at=timezone.now() - timedelta(days=1)
+        )
+
+        self.assertEqual([claimed.pk for claimed in queue.claim()], [task.pk])
+
+    def test_lost_lease_not_recorded(self):
+        """Test an attempt taken over by another worker records nothing"""
+        task = queue.enqueue("test_record", {"value": 1})
+        stale = queue.claim()[0]
+        Task.objects.filter(pk=task.pk).update(
+            heartbeat_at=timezone.now() - timedelta(days=1)
+        )
+        current = queue.claim()[0]
+
+        with self.assertLogs("core.queue", "WARNING") as logs:
+            self.assertEqual(queue.run(stale), queue.LOST)
+        self.assertIn("lease lost", logs.output[0])
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.RUNNING)
+        self.assertEqual(task.attempts, current.attempts)
+
+        self.assertEqual(queue.run(current), Task.DONE)
+
+    def test_metrics(self):
+        """Test the queue depth and wait metrics"""
+        queue.enqueue(
+            "test_record",
+            {"value": 1},
+            run_at=timezone.now() - timedelta(seconds=30)
+        )
+        queue.enqueue("test_fail")
+
+        metrics = queue.get_metrics()
+
+        self.assertEqual(metrics["depth"][Task.PENDING], 2)
+        self.assertEqual(metrics["depth"][Task.DONE], 0)
+        self.assertGreaterEqual(metrics["oldest_pending_seconds"], 30)
+        queue.run(queue.claim()[0])
+        self.assertGreaterEqual(queue.get_metrics()["avg_wait_seconds"], 30)
+
+
+class TaskLeaseTests(TransactionTestCase):
+    """Test the lease of running tasks is renewed"""
+
+    @override_settings(TASK_LEASE_SECONDS=0.3)
+    def test_lease_renewed_while_running(self):
+        """Test a task running longer than its lease is not claimed again"""
+        calls.clear()
+        task = queue.enqueue("test_outlive_lease", {"seconds": 0.6})
+
+        self.assertEqual(queue.run(queue.claim()[0]), Task.DONE)
+
+        self.assertEqual(calls, [[]])
+        task.refresh_from_db()
+        self.assertGreater(task.heartbeat_at, task.started_at)
@@ -0,0 +1,107 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from core import schema
+
+SCHEMA_URL = "/swagger/"
+
+
+class SchemaTests(TestCase):
+    """Test the prebuilt API schema"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(
+            SCHEMA_CACHE_DIR=self.directory,
+            CODE_VERSION="test"
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+    def test_schema_served_with_etag(self):
+        """Test the OpenAPI schema is served with an ETag"""
+        response = self.client.get(SCHEMA_URL, {"format": "openapi"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/openapi+json")
+        document = json.loads(response.content)
+        self.assertEqual(document["swagger"], "2.0")
+        self.assertIn("/api/recipes/recipes/", document["paths"])
+
+        response = self.client.get(
+            SCHEMA_URL,
+            {"format": "openapi"},
+            HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_schema_gzipped(self):
+        """Test clients accepting gzip get the compressed schema"""
+        response = self.client.get(
+            SCHEMA_URL,
+            {"format": "openapi"},
+            HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content))["swagger"],
+            "2.0"
+        )
+
+        response = self.client.get(
+            SCHEMA_URL,
+            {"format": "openapi"},
+            HTTP_ACCEPT_ENCODING="gzip;q=0, identity"
+        )
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(json.loads(response.content)["swagger"], "2.0")
+
+    def test_schema_built_once(self):
+        """Test the schema is built once, then read from memory or disk"""
+        with patch(
+            "core.schema.build_documents",
+            wraps=schema.build_documents
+        ) as build:
+            self.client.get(SCHEMA_URL)
+            self.client.get(SCHEMA_URL, {"format": "openapi"})
+            schema.clear()
+            response = self.client.get(SCHEMA_URL)
+
+            self.assertEqual(build.call_count, 1)
+            self.assertEqual(
+                response["Content-Type"],
+                "application/coreapi+json"
+            )
+
+            with override_settings(CODE_VERSION="other"):
+                schema.clear()
+                self.client.get(SCHEMA_URL)
+            self.assertEqual(build.call_count, 2)
+
+    def test_swagger_ui(self):
+        """Test browsers get the Swagger UI embedding the schema"""
+        response = self.client.get(SCHEMA_URL, HTTP_ACCEPT="text/html")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "window.drsSpec")
+        self.assertContains(response, "/api/recipes/recipes/")
+
+    def test_build_schema_command(self):
+        """Test the command writes the schema of the code version"""
+        call_command("build_schema", stdout=StringIO())
+
+        self.assertTrue(
+            os.path.exists(os.path.join(self.directory, "schema-test.json"))
+        )
@@ -0,0 +1,155 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core import slow_queries
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+SLOW_QUERIES_URL = reverse("slow-queries")
+
+
+class SlowQueryTests(TestCase):
+    """Test the slow query log"""
+
+    def setUp(self):
+        slow_queries.log.clear()
+        self.addCleanup(slow_queries.log.clear)
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password"
+        )
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Recipe",
+            time_minutes=10,
+            price=5
+        )
+        recipe.tags.add(tag)
+        self.tag = tag
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fingerprint(self):
+        """Test queries differing in their values share a fingerprint"""
+        first = slow_queries.fingerprint(
+            'SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) AND "a" = 1'
+        )
+        second = slow_queries.fingerprint(
+            "SELECT *  FROM \"t\"\nWHERE \"id\" IN (%s) AND \"a\" = 25"
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            first,
+            'SELECT * FROM "t" WHERE "id" IN (...) AND "a" = ?'
+        )
+        self.assertEqual(
+            slow_queries.fingerprint("SELECT 'it''s' FROM core_tag_2"),
+            "SELECT ? FROM core_tag_2"
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0.001, SLOW_QUERY_EXPLAIN_RATE=1)
+    def test_slow_queries_logged(self):
+        """Test slow queries are logged with their view and plan"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertLogs("core.slow_queries", "WARNING") as logs:
+            client.get(RECIPES_URL, {"tags": self.tag.id})
+            slow_queries.explainer.wait()
+
+        entries = slow_queries.log.get_entries()
+        self.assertTrue(entries)
+        self.assertIn("view=RecipeViewSet.list", logs.output[0])
+        self.assertIn("slow query plan", logs.output[-1])
+        recipe_queries = [
+            entry for entry in entries
+            if entry["fingerprint"].startswith("SELECT")
+            and "core_recipe_tags" in entry["sql"]
+        ]
+        self.assertTrue(recipe_queries)
+        self.assertEqual(recipe_queries[0]["view"], "RecipeViewSet.list")
+        self.assertIn("Plan", recipe_queries[0]["plan"][0])
+        self.assertIn("Execution Time", recipe_queries[0]["plan"][0])
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0.001, SLOW_QUERY_EXPLAIN_RATE=1)
+    def test_writes_not_explained(self):
+        """Test EXPLAIN ANALYZE never runs a write again"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertLogs("core.slow_queries", "WARNING"):
+            client.post(RECIPES_URL, {
+                "title": "New",
+                "time_minutes": 5,
+                "price": "1.00"
+            })
+            slow_queries.explainer.wait()
+
+        inserts = [
+            entry for entry in slow_queries.log.get_entries()
+            if entry["sql"].startswith("INSERT")
+        ]
+        self.assertTrue(inserts)
+        self.assertIsNone(inserts[0]["plan"])
+        self.assertEqual(Recipe.objects.filter(title="New").count(), 1)
+
+    @override_settings(SLOW_QUERY_EXPLAIN_RATE=1)
+    def test_locking_and_failed_not_explained(self):
+        """Test row locking and failed statements are never explained"""
+        self.assertTrue(slow_queries.is_explainable("SELECT 1"))
+        self.assertFalse(slow_queries.is_explainable(
+            'SELECT "id" FROM "core_task" FOR UPDATE SKIP LOCKED'
+        ))
+        self.assertFalse(slow_queries.is_explainable(
+            'SELECT "id" FROM "core_tag" for no key update'
+        ))
+
+        recorder = slow_queries.SlowQueryRecorder(0.001, 1)
+        with patch.object(slow_queries.explainer, "submit") as submit, \
+                self.assertLogs("core.slow_queries", "WARNING"):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic(), \
+                        connection.execute_wrapper(recorder):
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1 / 0")
+            with connection.execute_wrapper(recorder):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT "id" FROM "core_tag" FOR UPDATE'
+                    )
+
+        self.assertEqual(len(slow_queries.log.get_entries()), 2)
+        submit.assert_not_called()
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_disabled(self):
+        """Test nothing is logged when the threshold is 0"""
+        self.client.get(RECIPES_URL)
+
+        self.assertEqual(slow_queries.log.get_entries(), [])
+
+    def test_slow_queries_staff_only(self):
+        """Test only staff can list the slow queries"""
+        slow_queries.log.add({
+            "at": "2020-01-01T00:00:00+00:00",
+            "duration_ms": 120.0,
+            "view": "RecipeViewSet.list",
+            "fingerprint": "SELECT ?",
+            "sql": "SELECT 1",
+            "plan": None,
+        })
+        response = self.client.get(SLOW_QUERIES_URL)
+        self.assertEqual(response.status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(SLOW_QUERIES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["fingerprints"][0]["count"], 1)
+        self.assertEqual(response.json()["queries"][0]["sql"], "SELECT 1")
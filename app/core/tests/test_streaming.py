@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+from core.streaming import StreamingJSONRenderer, StreamingJSONResponse
+
+
+class StreamingJSONRendererTests(SimpleTestCase):
+
+    def test_output_matches_json_renderer(self):
+        """Test the streamed array matches JSONRenderer byte for byte"""
+        items = [
+            {"id": 1, "title": "Café  ", "price": Decimal("1.50")},
+            {"id": 2, "title": "Tea", "tags": [1, 2]},
+        ]
+
+        streamed = b"".join(StreamingJSONRenderer().iter_render(iter(items)))
+
+        self.assertEqual(streamed, JSONRenderer().render(items))
+
+    def test_empty_list(self):
+        """Test streaming no items renders an empty array"""
+        streamed = b"".join(StreamingJSONRenderer().iter_render([]))
+
+        self.assertEqual(streamed, b"[]")
+
+    def test_chunks_bounded_by_chunk_size(self):
+        """Test items are flushed once a chunk is full"""
+        renderer = StreamingJSONRenderer()
+        renderer.chunk_size = 20
+        items = ({"id": i, "title": "Recipe"} for i in range(10))
+
+        chunks = list(renderer.iter_render(items))
+
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) < 60 for chunk in chunks))
+        self.assertEqual(
+            b"".join(chunks),
+            JSONRenderer().render(
+                [{"id": i, "title": "Recipe"} for i in range(10)]
+            )
+        )
+
+    def test_response_is_streaming(self):
+        """Test the response streams the rendered chunks"""
+        response = StreamingJSONResponse(iter([{"id": 1}]))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(b"".join(response.streaming_content), b'[{"id":1}]')
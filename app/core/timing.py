@@ -0,0 +1,65 @@
+import math
+import threading
+import time
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Query count and time spent per phase while handling a request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook timing each query"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def add(self, phase, seconds):
+        """Add time to a phase"""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def get_header(self):
+        """Return the Server-Timing header value, durations in ms"""
+        metrics = [
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"'
+        ]
+        metrics += [
+            f"{phase};dur={seconds * 1000:.1f}"
+            for phase, seconds in self.phases.items()
+        ]
+        metrics.append(
+            f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}"
+        )
+        return ", ".join(metrics)
+
+
+def start():
+    """Start timing the current request and return its timings"""
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def stop():
+    """Stop timing the current request"""
+    _local.timings = None
+
+
+def current():
+    """Return the timings of the current request, None when not sampled"""
+    return getattr(_local, "timings", None)
+
+
+def percentile(values, q):
+    """Return the nearest rank q-th percentile of some values"""
+    ordered = sorted(values)
+    index = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
@@ -0,0 +1,120 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from core.models import Recipe, Tag
+
+COLUMNS = ("price", "time_minutes")
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _where(user_id, tag):
+    """Return the WHERE clause and params selecting the analysed recipes"""
+    clauses, params = ["TRUE"], []
+    if user_id is not None:
+        clauses.append("r.user_id = %s")
+        params.append(user_id)
+    if tag:
+        clauses.append(
+            f"""EXISTS (
+                SELECT 1 FROM {Recipe.tags.through._meta.db_table} rt
+                JOIN {Tag._meta.db_table} t ON t.id = rt.tag_id
+                WHERE rt.recipe_id = r.id AND t.name = %s
+            )"""
+        )
+        params.append(tag)
+
+    return " AND ".join(clauses), params
+
+
+def _histogram(cursor, column, where, params, low, high, bins, count):
+    """Count the recipes falling in bins equal width buckets of a column"""
+    if low == high:
+        return [{"start": low, "end": high, "count": count}]
+
+    cursor.execute(
+        f"""
+        SELECT LEAST(width_bucket(r.{column}::float8, %s, %s, %s), %s),
+            COUNT(*)
+        FROM {Recipe._meta.db_table} r
+        WHERE {where}
+        GROUP BY 1
+        """,
+        [low, high, bins, bins] + params
+    )
+    counts = dict(cursor.fetchall())
+    width = (high - low) / bins
+
+    return [
+        {
+            "start": low + width * i,
+            "end": low + width * (i + 1),
+            "count": counts.get(i + 1, 0)
+        }
+        for i in range(bins)
+    ]
+
+
+def compute_distributions(user_id=None, tag=None, bins=10):
+    """Return histograms, quantiles and correlation of price and time
+
+    Everything is aggregated by Postgres in a single pass per statement,
+    no rows are brought into Python.
+    """
+    where, params = _where(user_id, tag)
+    aggregates = []
+    for column in COLUMNS:
+        aggregates += [
+            f"MIN(r.{column})",
+            f"MAX(r.{column})",
+            f"AVG(r.{column})",
+            f"percentile_cont(%s::float8[]) "
+            f"WITHIN GROUP (ORDER BY r.{column})",
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT COUNT(*), corr(r.price, r.time_minutes),
+                {", ".join(aggregates)}
+            FROM {Recipe._meta.db_table} r
+            WHERE {where}
+            """,
+            [list(QUANTILES)] * len(COLUMNS) + params
+        )
+        row = cursor.fetchone()
+        data = {"count": row[0], "correlation": _to_float(row[1])}
+        values = row[2:]
+        for index, column in enumerate(COLUMNS):
+            low, high, mean, quantiles = values[index * 4:index * 4 + 4]
+            low, high = _to_float(low), _to_float(high)
+            data[column] = {
+                "min": low,
+                "max": high,
+                "mean": _to_float(mean),
+                "quantiles": {
+                    f"p{round(q * 100)}": value
+                    for q, value in zip(QUANTILES, quantiles or [])
+                },
+                "histogram": [] if not data["count"] else _histogram(
+                    cursor, column, where, params, low, high, bins,
+                    data["count"]
+                )
+            }
+
+    return data
+
+
+def get_global_distributions(tag=None, bins=10):
+    """Return the distributions over every recipe, cached for a while"""
+    key = hashlib.md5(f"{bins}:{tag or ''}".encode("utf-8")).hexdigest()
+    return cache.get_or_set(
+        f"recipe-analytics:{key}",
+        lambda: compute_distributions(tag=tag, bins=bins),
+        settings.ANALYTICS_CACHE_TIMEOUT
+    )
@@ -0,0 +1,61 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.benchmarking import create_dataset
+from core.models import Recipe
+from recipe.readers import RecipeReader
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare the recipe serializers with the fast path"""
+
+    help = "Benchmark RecipeSerializer against the read only fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=3)
+        parser.add_argument("--ingredients", type=int, default=8)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = create_dataset(
+                options["recipes"],
+                options["tags"],
+                options["ingredients"]
+            )["user"]
+            queryset = Recipe.objects.filter(user=user).order_by("-id")
+            for detail in (False, True):
+                self.compare(queryset, detail, options["repeat"])
+            transaction.set_rollback(True)
+
+    def compare(self, queryset, detail, repeat):
+        """Time both representations of the queryset and print the speedup"""
+        serializer_class = RecipeSerializer
+        if detail:
+            serializer_class = RecipeDetailSerializer
+        reader = RecipeReader(detail=detail)
+
+        def run_serializer():
+            return serializer_class(queryset.prefetch_related(
+                "tags", "ingredients"
+            ), many=True).data
+
+        def run_reader():
+            return reader.serialize(queryset)
+
+        if run_serializer() != run_reader():
+            self.stderr.write("Fast path output differs from serializer")
+
+        serializer_time = min(timeit.repeat(run_serializer, number=1,
+                                            repeat=repeat))
+        reader_time = min(timeit.repeat(run_reader, number=1, repeat=repeat))
+        label = "detail" if detail else "list"
+        self.stdout.write(
+            f"{label}: {queryset.count()} recipes, "
+            f"serializer {serializer_time * 1000:.1f}ms, "
+            f"fast path {reader_time * 1000:.1f}ms, "
+            f"speedup {serializer_time / reader_time:.1f}x"
+        )
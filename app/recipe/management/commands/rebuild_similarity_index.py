@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from core.models import Recipe
+from recipe.similarity import update_signatures
+
+
+class Command(BaseCommand):
+    """Django command to recompute the similar recipes index"""
+
+    help = "Recompute the MinHash signatures of every recipe"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        recipe_ids = Recipe.objects.order_by("id").values_list(
+            "id",
+            flat=True
+        ).iterator(chunk_size=batch_size)
+
+        total = 0
+        batch = []
+        for recipe_id in recipe_ids:
+            batch.append(recipe_id)
+            if len(batch) == batch_size:
+                update_signatures(batch)
+                total += len(batch)
+                batch = []
+        update_signatures(batch)
+        total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the signatures of {total} recipes"
+        ))
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipe.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    """Django command to recompute the recipe stats of every user"""
+
+    help = "Recompute the per user recipe stats and tag usage"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, nargs="*")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = get_user_model().objects.order_by("id").values_list(
+            "id",
+            flat=True
+        )
+        if options["user_id"]:
+            user_ids = user_ids.filter(id__in=options["user_id"])
+
+        batch_size = options["batch_size"]
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), batch_size):
+            with transaction.atomic():
+                rebuild_stats(user_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats of {len(user_ids)} users"
+        ))
@@ -0,0 +1,240 @@
+import io
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.models import Recipe, Tag, Ingredient
+from recipe.stats import rebuild_stats
+
+
+def zipf_cum_weights(size, exponent):
+    """Return the cumulative Zipf weights of size ranks"""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def reserve_ids(cursor, model, count):
+    """Advance the id sequence of a model by count, return the first id"""
+    if not count:
+        return 0
+    table = model._meta.db_table
+    cursor.execute(
+        """
+        SELECT setval(
+            pg_get_serial_sequence(%s, 'id'),
+            nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1
+        )
+        """,
+        [table, table, count]
+    )
+    return cursor.fetchone()[0] - count + 1
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Bulk load tab separated rows with COPY"""
+    buffer = io.StringIO()
+    buffer.writelines(
+        "\t".join(map(str, row)) + "\n" for row in rows
+    )
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+        buffer
+    )
+
+
+class Command(BaseCommand):
+    """Django command to load a large synthetic dataset"""
+
+    help = (
+        "Generate users with Zipf distributed tags and ingredients on their "
+        "recipes, bulk loaded with COPY"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes-per-user", type=int, default=100)
+        parser.add_argument("--tags-per-user", type=int, default=30)
+        parser.add_argument("--ingredients-per-user", type=int, default=200)
+        parser.add_argument("--tags-per-recipe", type=int, default=3)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--zipf-exponent", type=float, default=1.1)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-users", type=int, default=100)
+        parser.add_argument(
+            "--password",
+            default="seed-password",
+            help="Password of every generated user, hashed once"
+        )
+        parser.add_argument(
+            "--skip-stats",
+            action="store_true",
+            help="Do not rebuild the recipe stats of the generated users"
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.password = make_password(options["password"])
+        self.tag_weights = zipf_cum_weights(
+            options["tags_per_user"],
+            options["zipf_exponent"]
+        )
+        self.ingredient_weights = zipf_cum_weights(
+            options["ingredients_per_user"],
+            options["zipf_exponent"]
+        )
+
+        started = time.perf_counter()
+        self.counts = dict.fromkeys(
+            ("users", "recipes", "tags", "ingredients", "links"), 0
+        )
+        user_ids = []
+        tables = [
+            model._meta.db_table
+            for model in (get_user_model(), Tag, Ingredient, Recipe)
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Nobody else may take ids from the ranges reserved below
+            cursor.execute(
+                f"LOCK TABLE {', '.join(tables)} IN EXCLUSIVE MODE"
+            )
+            remaining = options["users"]
+            while remaining > 0:
+                batch = min(remaining, options["batch_users"])
+                user_ids += self.load_batch(cursor, batch)
+                remaining -= batch
+            if not options["skip_stats"] and user_ids:
+                rebuild_stats(user_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{count} {name}" for name, count in self.counts.items())
+            + f" loaded in {time.perf_counter() - started:.1f}s"
+        ))
+        self.stdout.write(
+            "Run rebuild_similarity_index to index the similar recipes"
+        )
+
+    def load_batch(self, cursor, user_count):
+        """Generate and COPY the rows of user_count users"""
+        options = self.options
+        rng = self.rng
+        tags_per_user = options["tags_per_user"]
+        ingredients_per_user = options["ingredients_per_user"]
+        recipe_counts = [
+            rng.randint(
+                options["recipes_per_user"] // 2,
+                options["recipes_per_user"] * 3 // 2
+            )
+            for _ in range(user_count)
+        ]
+
+        first_user = reserve_ids(cursor, get_user_model(), user_count)
+        first_tag = reserve_ids(cursor, Tag, user_count * tags_per_user)
+        first_ingredient = reserve_ids(
+            cursor,
+            Ingredient,
+            user_count * ingredients_per_user
+        )
+        first_recipe = reserve_ids(cursor, Recipe, sum(recipe_counts))
+        user_ids = list(range(first_user, first_user + user_count))
+
+        copy_rows(
+            cursor,
+            get_user_model()._meta.db_table,
+            ("id", "password", "is_superuser", "email", "name", "is_active",
+             "is_staff"),
+            (
+                (user_id, self.password, "f",
+                 f"seed-{user_id}@mysimpleapplication.com",
+                 f"Seed User {user_id}", "t", "f")
+                for user_id in user_ids
+            )
+        )
+        copy_rows(
+            cursor,
+            Tag._meta.db_table,
+            ("id", "user_id", "name"),
+            (
+                (first_tag + index * tags_per_user + rank, user_id,
+                 f"Tag {rank + 1}")
+                for index, user_id in enumerate(user_ids)
+                for rank in range(tags_per_user)
+            )
+        )
+        copy_rows(
+            cursor,
+            Ingredient._meta.db_table,
+            ("id", "user_id", "name"),
+            (
+                (first_ingredient + index * ingredients_per_user + rank,
+                 user_id, f"Ingredient {rank + 1}")
+                for index, user_id in enumerate(user_ids)
+                for rank in range(ingredients_per_user)
+            )
+        )
+
+        recipes, tag_links, ingredient_links = [], [], []
+        recipe_id = first_recipe
+        for index, user_id in enumerate(user_ids):
+            tag_base = first_tag + index * tags_per_user
+            ingredient_base = first_ingredient + index * ingredients_per_user
+            for _ in range(recipe_counts[index]):
+                recipes.append((
+                    recipe_id,
+                    user_id,
+                    f"Recipe {recipe_id}",
+                    min(int(rng.lognormvariate(3.3, 0.6)) + 1, 24 * 60),
+                    f"{min(rng.lognormvariate(2.3, 0.7), 999.99):.2f}",
+                    ""
+                ))
+                if tags_per_user:
+                    tag_links += [
+                        (recipe_id, tag_base + rank)
+                        for rank in set(rng.choices(
+                            range(tags_per_user),
+                            cum_weights=self.tag_weights,
+                            k=options["tags_per_recipe"]
+                        ))
+                    ]
+                if ingredients_per_user:
+                    ingredient_links += [
+                        (recipe_id, ingredient_base + rank)
+                        for rank in set(rng.choices(
+                            range(ingredients_per_user),
+                            cum_weights=self.ingredient_weights,
+                            k=options["ingredients_per_recipe"]
+                        ))
+                    ]
+                recipe_id += 1
+
+        copy_rows(
+            cursor,
+            Recipe._meta.db_table,
+            ("id", "user_id", "title", "time_minutes", "price", "link"),
+            recipes
+        )
+        copy_rows(
+            cursor,
+            Recipe.tags.through._meta.db_table,
+            ("recipe_id", "tag_id"),
+            sorted(tag_links)
+        )
+        copy_rows(
+            cursor,
+            Recipe.ingredients.through._meta.db_table,
+            ("recipe_id", "ingredient_id"),
+            sorted(ingredient_links)
+        )
+
+        self.counts["users"] += user_count
+        self.counts["tags"] += user_count * tags_per_user
+        self.counts["ingredients"] += user_count * ingredients_per_user
+        self.counts["recipes"] += len(recipes)
+        self.counts["links"] += len(tag_links) + len(ingredient_links)
+        return user_ids
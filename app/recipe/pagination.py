@@ -0,0 +1,126 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Opt in keyset pagination over an ordering ending with the id
+
+    Only used when ?page_size= or ?cursor= is given, so unpaginated clients
+    keep getting plain lists. The cursor holds the ordering value and id of
+    the last recipe of the page, and the next page is read with a range
+    condition matching the composite (user, column, id) indexes instead of
+    an offset.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the queryset of the requested page, None if unpaginated"""
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if page_size is None and cursor is None:
+            return None
+
+        self.request = request
+        self.page_size = page_size or self.page_size
+        self.ordering = queryset.query.order_by
+        field = self.ordering[0].lstrip("-")
+        descending = self.ordering[0].startswith("-")
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(
+                    self.after(field, descending, cursor)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        keys = list(
+            queryset.values_list(field, "id")[:self.page_size + 1]
+        )
+        self.next_key = None
+        if len(keys) > self.page_size:
+            keys = keys[:self.page_size]
+            self.next_key = keys[-1]
+
+        return queryset.filter(id__in=[key[-1] for key in keys])
+
+    def after(self, field, descending, cursor):
+        """Return the condition selecting the rows after a cursor"""
+        if len(cursor) != (1 if field == "id" else 2):
+            raise NotFound(self.invalid_cursor_message)
+        if field == "id":
+            lookup = "id__lt" if descending else "id__gt"
+            return Q(**{lookup: cursor[0]})
+        value, last_id = cursor
+        if descending:
+            return Q(**{f"{field}__lte": value}) & (
+                Q(**{f"{field}__lt": value}) | Q(id__lt=last_id)
+            )
+        return Q(**{f"{field}__gte": value}) & (
+            Q(**{f"{field}__gt": value}) | Q(id__gt=last_id)
+        )
+
+    def get_page_size(self, request):
+        """Return the page size asked for, capped at max_page_size"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return None
+        if page_size <= 0:
+            return None
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return the key held by the cursor parameter, if any"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+        except (ValueError, Base64Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, list):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, key):
+        """Return the cursor parameter of a (value, id) key"""
+        if self.ordering[0].lstrip("-") == "id":
+            key = [key[-1]]
+        else:
+            key = [str(key[0]), key[-1]]
+        return urlsafe_b64encode(
+            json.dumps(key).encode("utf-8")
+        ).decode("ascii")
+
+    def get_next_link(self):
+        """Return the URL of the next page, None on the last one"""
+        if self.next_key is None:
+            return None
+        url = replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_size_query_param,
+            self.page_size
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(self.next_key)
+        )
+
+    def get_paginated_response(self, data):
+        """Wrap a page with the link to the next one"""
+        if isinstance(data, dict):
+            return Response({"next": self.get_next_link(), **data})
+        return Response({"next": self.get_next_link(), "results": data})
@@ -0,0 +1,213 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+from core.models import Recipe, RecipeStats
+
+STATS_TABLE = RecipeStats._meta.db_table
+VERSION_SEQUENCE = f"{STATS_TABLE}_ingredients_version_seq"
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+class PantryIndex:
+    """Ingredient sets of the recipes of one user as integer bitsets
+
+    Each ingredient the user's recipes use gets a bit position, each recipe
+    the mask of its ingredients, so covering a pantry is a couple of integer
+    operations per recipe.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.bits = {}
+        self.ingredient_ids = []
+        self.recipes = {}
+
+    def _bit(self, ingredient_id):
+        """Return the bit position of an ingredient, assigning a new one"""
+        bit = self.bits.get(ingredient_id)
+        if bit is None:
+            bit = self.bits[ingredient_id] = len(self.ingredient_ids)
+            self.ingredient_ids.append(ingredient_id)
+        return bit
+
+    def _mask(self, ingredient_ids):
+        """Return the mask of the known ingredients among some ids"""
+        mask = 0
+        for ingredient_id in ingredient_ids:
+            bit = self.bits.get(ingredient_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def add(self, recipe_id, ingredient_ids):
+        """Add ingredients to a recipe"""
+        mask = self.recipes.get(recipe_id, 0)
+        for ingredient_id in ingredient_ids:
+            mask |= 1 << self._bit(ingredient_id)
+        if mask:
+            self.recipes[recipe_id] = mask
+
+    def remove(self, recipe_id, ingredient_ids=None):
+        """Remove some or, without ids, all the ingredients of a recipe"""
+        mask = 0
+        if ingredient_ids is not None:
+            mask = self.recipes.get(recipe_id, 0) & ~self._mask(
+                ingredient_ids
+            )
+        if mask:
+            self.recipes[recipe_id] = mask
+        else:
+            self.recipes.pop(recipe_id, None)
+
+    def match(self, pantry_ids, max_missing=0):
+        """Return (recipe id, missing ingredient ids) covered by a pantry
+
+        Recipes without ingredients are not indexed and never match. Results
+        are ranked by missing count, then recipe id.
+        """
+        lacking = ~self._mask(pantry_ids)
+        matches = []
+        for recipe_id, mask in self.recipes.items():
+            missing = mask & lacking
+            count = bin(missing).count("1")
+            if count <= max_missing:
+                matches.append((count, recipe_id, missing))
+        matches.sort(key=lambda item: item[:2])
+
+        return [
+            (recipe_id, self._ids(missing))
+            for count, recipe_id, missing in matches
+        ]
+
+    def _ids(self, mask):
+        """Return the ingredient ids set in a mask"""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.ingredient_ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+
+def get_version(user_id):
+    """Return the ingredients version of a user"""
+    version = RecipeStats.objects.filter(user_id=user_id).values_list(
+        "ingredients_version", flat=True
+    ).first()
+    return version or 0
+
+
+def bump_version(user_id, create=True):
+    """Give the ingredients of a user a new version, return (old, new)
+
+    Versions come from a sequence, which a rollback does not rewind, so an
+    index patched by a write that rolled back never matches a later
+    version. Without create the row is only updated, so users deleted along
+    with their recipes are not inserted back, and (None, None) is returned
+    for them. The old version is None as well when the row is created.
+    """
+    params = {"user_id": user_id, "sequence": VERSION_SEQUENCE}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {STATS_TABLE} AS stats
+            SET ingredients_version = nextval(%(sequence)s)
+            FROM (
+                SELECT user_id, ingredients_version FROM {STATS_TABLE}
+                WHERE user_id = %(user_id)s
+                FOR UPDATE
+            ) AS old
+            WHERE stats.user_id = old.user_id
+            RETURNING old.ingredients_version, stats.ingredients_version
+            """,
+            params
+        )
+        row = cursor.fetchone()
+        if row is None and create:
+            # No version the loaded index could be current at, or the row
+            # was inserted meanwhile
+            cursor.execute(
+                f"""
+                INSERT INTO {STATS_TABLE} AS stats (
+                    user_id, recipe_count, total_time_minutes, tag_count,
+                    ingredient_count, ingredients_version
+                ) VALUES (%(user_id)s, 0, 0, 0, 0, nextval(%(sequence)s))
+                ON CONFLICT (user_id) DO UPDATE SET
+                    ingredients_version = EXCLUDED.ingredients_version
+                RETURNING NULL, ingredients_version
+                """,
+                params
+            )
+            row = cursor.fetchone()
+
+    return row if row else (None, None)
+
+
+def build_index(user_id, version):
+    """Load the index of a user from the recipe ingredient rows"""
+    index = PantryIndex(version)
+    rows = Recipe.ingredients.through.objects.filter(
+        recipe__user_id=user_id
+    ).order_by("recipe_id", "ingredient_id").values_list(
+        "recipe_id", "ingredient_id"
+    )
+    for recipe_id, ingredient_id in rows.iterator():
+        index.add(recipe_id, [ingredient_id])
+
+    return index
+
+
+def get_index(user_id):
+    """Return the index of a user, rebuilt if another writer changed it
+
+    The stored version is checked on every call, so indexes patched by
+    other processes or by writes that rolled back are never served.
+    """
+    version = get_version(user_id)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and index.version == version:
+            _indexes.move_to_end(user_id)
+            return index
+
+    index = build_index(user_id, version)
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > settings.PANTRY_INDEX_MAX_USERS:
+            _indexes.popitem(last=False)
+
+    return index
+
+
+def apply_change(user_id, change=None, create=True):
+    """Bump the version of a user and patch the loaded index in place
+
+    The index is patched only when it was current right before the write,
+    otherwise, or without a change, it is dropped and rebuilt on next read.
+    """
+    previous, version = bump_version(user_id, create=create)
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is None:
+            return
+        if change is None or previous is None or index.version != previous:
+            del _indexes[user_id]
+            return
+        change(index)
+        index.version = version
+
+
+def clear():
+    """Drop every loaded index"""
+    with _lock:
+        _indexes.clear()
+
+
+def find_cookable(user_id, pantry_ids, max_missing=0):
+    """Return (recipe id, missing ingredient ids) a pantry can cook"""
+    return get_index(user_id).match(pantry_ids, max_missing)
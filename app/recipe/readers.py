@@ -0,0 +1,167 @@
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+
+from rest_framework import serializers as drf_serializers
+from core.models import Recipe
+from recipe import serializers
+
+# Serializer fields whose representation of a database value is the value
+# itself, so the fast path can copy them straight from the row
+PASSTHROUGH_FIELDS = (drf_serializers.IntegerField, drf_serializers.CharField)
+RELATED_FIELDS = serializers.RECIPE_RELATIONS
+
+
+def _chunks(iterable, size):
+    """Yield lists of at most size items from an iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _compile_converter(field):
+    """Return a callable converting a column value to its representation"""
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    to_representation = field.to_representation
+
+    def convert(value):
+        return None if value is None else to_representation(value)
+
+    return convert
+
+
+class RecipeReader:
+    """Read only representation of recipes built from values() rows
+
+    Produces the same output as RecipeSerializer (RecipeDetailSerializer when
+    detail is set) without instantiating models or serializer fields per row.
+    Passing fields limits both the output and the columns and relations read.
+    """
+
+    def __init__(self, detail=False, fields=None, batch_size=500):
+        serializer_class = serializers.RecipeSerializer
+        if detail:
+            serializer_class = serializers.RecipeDetailSerializer
+        serializer_fields = serializer_class().fields
+        self.detail = detail
+        self.batch_size = batch_size
+        self.field_names = tuple(
+            name for name in serializer_class.Meta.fields
+            if fields is None or name in fields
+        )
+        self.related = tuple(
+            name for name in self.field_names if name in RELATED_FIELDS
+        )
+        self.columns = ("id",) + tuple(
+            name for name in self.field_names
+            if name not in RELATED_FIELDS and name != "id"
+        )
+        self.extractors = tuple(
+            (name, name in RELATED_FIELDS,
+             None if name in RELATED_FIELDS
+             else _compile_converter(serializer_fields[name]))
+            for name in self.field_names
+        )
+
+    def serialize(self, queryset):
+        """Return the representation of every recipe in the queryset"""
+        rows = list(queryset.values(*self.columns))
+        data = []
+        for chunk in _chunks(rows, self.batch_size):
+            data.extend(self.represent(chunk))
+
+        return data
+
+    def iter_serialize(self, queryset):
+        """Yield recipe representations holding one batch in memory at once"""
+        rows = queryset.values(*self.columns).iterator(
+            chunk_size=self.batch_size
+        )
+        for chunk in _chunks(rows, self.batch_size):
+            yield from self.represent(chunk)
+
+    def serialize_compound(self, queryset, include):
+        """Return recipes with related ids plus each related object once
+
+        The recipes go under "results" and the tags/ingredients named in
+        include under "included", without repeating shared objects.
+        """
+        included = {name: {} for name in include}
+        rows = list(queryset.values(*self.columns))
+        results = []
+        for chunk in _chunks(rows, self.batch_size):
+            results.extend(self.represent(chunk, included))
+
+        return {
+            "results": results,
+            "included": {
+                name: sorted(objects.values(), key=itemgetter("id"))
+                for name, objects in included.items()
+            }
+        }
+
+    def represent(self, rows, included=None):
+        """Represent a batch of values() rows, fetching their relations"""
+        included = included or {}
+        recipe_ids = {row["id"] for row in rows}
+        related = {
+            name: self.fetch_related(name, recipe_ids, included.get(name))
+            for name in RELATED_FIELDS
+            if name in self.related or name in included
+        }
+        for row in rows:
+            item = {}
+            for name, is_related, convert in self.extractors:
+                if is_related:
+                    item[name] = related[name].get(row["id"], [])
+                elif convert:
+                    item[name] = convert(row[name])
+                else:
+                    item[name] = row[name]
+            yield item
+
+    def fetch_related(self, name, recipe_ids, included=None):
+        """Group the related ids (or objects on detail) by recipe id
+
+        When included is given every related object is also added to it
+        once, keyed by its id.
+        """
+        field = Recipe._meta.get_field(name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        with_names = self.detail or included is not None
+        columns = [f"{source}_id", f"{target}_id"]
+        if with_names:
+            columns.append(f"{target}__name")
+        through_rows = field.remote_field.through.objects.filter(
+            **{f"{source}_id__in": recipe_ids}
+        ).order_by(f"{target}_id").values_list(*columns)
+
+        grouped = defaultdict(list)
+        if not with_names:
+            for recipe_id, related_id in through_rows:
+                grouped[recipe_id].append(related_id)
+            return grouped
+
+        for recipe_id, related_id, related_name in through_rows:
+            obj = {"id": related_id, "name": related_name}
+            if included is not None:
+                included.setdefault(related_id, obj)
+            grouped[recipe_id].append(obj if self.detail else related_id)
+
+        return grouped
+
+
+@lru_cache(maxsize=None)
+def get_reader(detail=False, fields=None):
+    """Return a shared, precompiled recipe reader
+
+    fields has to be hashable, a tuple of names or None for all fields.
+    """
+    return RecipeReader(detail=detail, fields=fields)
@@ -1,8 +1,144 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models.signals import m2m_changed
 from rest_framework import serializers
-from core.models import Tag, Ingredient, Recipe
+from rest_framework.relations import MANY_RELATION_KWARGS
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+from recipe import stats
 
 
-class TagSerializer(serializers.ModelSerializer):
+RECIPE_RELATIONS = ("ingredients", "tags")
+
+
+def _send_m2m_changed(instance, field, action, pk_set):
+    """Send m2m_changed the way the related managers do"""
+    m2m_changed.send(
+        sender=field.remote_field.through,
+        instance=instance,
+        action=action,
+        reverse=False,
+        model=field.related_model,
+        pk_set=pk_set,
+        using=instance._state.db
+    )
+
+
+def write_relation(instance, name, objects, created=False):
+    """Make a many to many relation hold objects, writing only the diff
+
+    Removed and added rows are written with one statement each, nothing is
+    written when the relation did not change. m2m_changed is sent like
+    set() would. created skips reading the rows of a new instance.
+    """
+    field = instance._meta.get_field(name)
+    through = field.remote_field.through
+    source = f"{field.m2m_field_name()}_id"
+    target = f"{field.m2m_reverse_field_name()}_id"
+
+    new_ids = {obj.pk for obj in objects}
+    current_ids = set()
+    if not created:
+        current_ids = set(through.objects.filter(
+            **{source: instance.pk}
+        ).values_list(target, flat=True))
+
+    removed = current_ids - new_ids
+    if removed:
+        _send_m2m_changed(instance, field, "pre_remove", removed)
+        through.objects.filter(
+            **{source: instance.pk, f"{target}__in": removed}
+        ).delete()
+        _send_m2m_changed(instance, field, "post_remove", removed)
+
+    added = new_ids - current_ids
+    if added:
+        _send_m2m_changed(instance, field, "pre_add", added)
+        through.objects.bulk_create(
+            through(**{source: instance.pk, target: pk})
+            for pk in sorted(added)
+        )
+        _send_m2m_changed(instance, field, "post_add", added)
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Many related field validating the whole list of pks in one query"""
+    default_error_messages = {
+        "does_not_exist": 'Invalid pk(s) "{pk_values}" - '
+                          'object(s) do not exist.',
+    }
+
+    def to_internal_value(self, data):
+        """Return the objects for a list of pks, reporting all missing"""
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            try:
+                pks.append(pk_field.to_python(item))
+            except (DjangoValidationError, TypeError, ValueError):
+                self.child_relation.fail(
+                    "incorrect_type",
+                    data_type=type(item).__name__
+                )
+        pks = list(dict.fromkeys(pks))
+        if not pks:
+            return []
+
+        objects = queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail(
+                "does_not_exist",
+                pk_values=", ".join(str(pk) for pk in missing)
+            )
+
+        return [objects[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to the objects of the request user
+
+    With many=True the submitted pks are validated together by a
+    BatchedManyRelatedField.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Wrap the field in a BatchedManyRelatedField"""
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """Return the objects owned by the request user"""
+        queryset = super().get_queryset()
+        request = self.context.get("request")
+        if request is None:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """Model serializer accepting a fields argument to trim its fields"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TagSerializer(DynamicFieldsModelSerializer):
     """Serialize tag objects"""
 
     class Meta:
@@ -11,7 +147,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(DynamicFieldsModelSerializer):
     """Serialize ingredient objects"""
 
     class Meta:
@@ -20,13 +156,13 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(DynamicFieldsModelSerializer):
     """Serialize recipe objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -39,6 +175,39 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id",)
 
+    def create(self, validated_data):
+        """Create a recipe inserting its relations in one statement each"""
+        relations = {
+            name: validated_data.pop(name)
+            for name in RECIPE_RELATIONS if name in validated_data
+        }
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            for name, objects in relations.items():
+                write_relation(instance, name, objects, created=True)
+
+        return instance
+
+    def update(self, instance, validated_data):
+        """Update a recipe writing only the changed columns and relations"""
+        relations = {
+            name: validated_data.pop(name)
+            for name in RECIPE_RELATIONS if name in validated_data
+        }
+        changed = [
+            name for name, value in validated_data.items()
+            if getattr(instance, name) != value
+        ]
+        with transaction.atomic():
+            for name in changed:
+                setattr(instance, name, validated_data[name])
+            if changed:
+                instance.save(update_fields=changed)
+            for name, objects in relations.items():
+                write_relation(instance, name, objects)
+
+        return instance
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
@@ -53,3 +222,21 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ("id", "image")
         read_only_fields = ("id",)
+
+
+class RecipeStatsSerializer(serializers.ModelSerializer):
+    """Serialize the recipe stats of a user"""
+    avg_time_minutes = serializers.FloatField(read_only=True)
+    top_tags = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecipeStats
+        fields = (
+            "recipe_count", "avg_time_minutes", "min_price", "max_price",
+            "tag_count", "ingredient_count", "top_tags"
+        )
+        read_only_fields = fields
+
+    def get_top_tags(self, obj):
+        """Return the most used tags of the user"""
+        return stats.get_top_tags(obj.user_id)
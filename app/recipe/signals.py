@@ -0,0 +1,137 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, \
+     m2m_changed
+from django.dispatch import receiver
+from core.models import Recipe, Tag, Ingredient
+from recipe import stats, similarity, pantry
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, update_fields, **kwargs):
+    stats.recipe_saved(instance, created, update_fields)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # The through rows go away without m2m_changed, count them first
+    stats.subtract_tag_usage(list(
+        instance.tags.through.objects.filter(
+            recipe_id=instance.pk
+        ).values_list("tag_id", flat=True)
+    ))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    stats.recipe_deleted(instance)
+    pantry.apply_change(
+        instance.user_id,
+        lambda index: index.remove(instance.pk),
+        create=False
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # pk_set is not given on clear, read what is about to be removed
+        if reverse:
+            pk_set = {instance.pk}
+            count = instance.recipe_set.count()
+        else:
+            pk_set = set(instance.tags.values_list("id", flat=True))
+            count = 1
+        stats.subtract_tag_usage(pk_set, count)
+    elif action in ("post_add", "post_remove"):
+        # On the reverse side the tag is the instance and pk_set has recipes
+        tag_ids, count = pk_set, 1
+        if reverse:
+            tag_ids, count = [instance.pk], len(pk_set)
+        if action == "post_add":
+            stats.add_tag_usage(tag_ids, count)
+        else:
+            stats.subtract_tag_usage(tag_ids, count)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.add_to_stats(instance.user_id, tags=1)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    stats.subtract_from_stats(instance.user_id, tags=1)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.add_to_stats(instance.user_id, ingredients=1)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    stats.subtract_from_stats(instance.user_id, ingredients=1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_features_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            similarity.update_signatures([instance.pk])
+    elif action == "pre_clear":
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        similarity.update_signatures(instance._cleared_recipe_ids)
+    elif action in ("post_add", "post_remove"):
+        similarity.update_signatures(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_feature_deleting(sender, instance, **kwargs):
+    # The through rows go away without m2m_changed, remember the recipes
+    instance._recipe_ids = list(
+        instance.recipe_set.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_feature_deleted(sender, instance, **kwargs):
+    similarity.update_signatures(getattr(instance, "_recipe_ids", []))
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # Several recipes changed at once, let the index reload
+        pantry.apply_change(instance.user_id)
+    elif action == "post_add":
+        pantry.apply_change(
+            instance.user_id,
+            lambda index: index.add(instance.pk, pk_set)
+        )
+    elif action == "post_remove":
+        pantry.apply_change(
+            instance.user_id,
+            lambda index: index.remove(instance.pk, pk_set)
+        )
+    else:
+        pantry.apply_change(
+            instance.user_id,
+            lambda index: index.remove(instance.pk)
+        )
+
+
+@receiver(post_delete, sender=Ingredient)
+def pantry_ingredient_deleted(sender, instance, **kwargs):
+    if getattr(instance, "_recipe_ids", None):
+        pantry.apply_change(instance.user_id, create=False)
@@ -0,0 +1,124 @@
+import hashlib
+import random
+from collections import defaultdict
+
+from django.db import connection, transaction
+from core.models import Recipe, RecipeSignature
+
+BANDS = 16
+ROWS = 2
+PRIME = (1 << 61) - 1
+CANDIDATES = 200
+
+# Fixed seed so every process computes the same signatures
+_random = random.Random(20200812)
+HASHES = [
+    (_random.randrange(1, PRIME), _random.randrange(0, PRIME))
+    for _ in range(BANDS * ROWS)
+]
+
+
+def get_features(recipe_ids):
+    """Return the ingredient and tag tokens of each recipe
+
+    Ingredient ids become even tokens and tag ids odd ones so both share a
+    single set per recipe.
+    """
+    features = defaultdict(set)
+    for name, offset in (("ingredients", 0), ("tags", 1)):
+        field = Recipe._meta.get_field(name)
+        target = f"{field.m2m_reverse_field_name()}_id"
+        rows = field.remote_field.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list("recipe_id", target)
+        for recipe_id, related_id in rows:
+            features[recipe_id].add(related_id * 2 + offset)
+
+    return features
+
+
+def get_buckets(user_id, features):
+    """Return the LSH band buckets of a feature set
+
+    Buckets include the user id, so only recipes of the same user share
+    them.
+    """
+    signature = [
+        min((a * token + b) % PRIME for token in features)
+        for a, b in HASHES
+    ]
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(
+            f"{user_id}:{band}:{rows}".encode("utf-8"),
+            digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+
+    return buckets
+
+
+def update_signatures(recipe_ids):
+    """Recompute the signatures of some recipes from their relations"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    features = get_features(recipe_ids)
+    users = dict(
+        Recipe.objects.filter(id__in=recipe_ids).values_list("id", "user_id")
+    )
+    signatures = [
+        RecipeSignature(
+            recipe_id=recipe_id,
+            buckets=get_buckets(users[recipe_id], features[recipe_id])
+        )
+        for recipe_id in users if features[recipe_id]
+    ]
+    with transaction.atomic():
+        RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSignature.objects.bulk_create(signatures)
+
+
+def jaccard(first, second):
+    """Return the Jaccard index of two sets"""
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+def find_similar(recipe_id, limit=10):
+    """Return (recipe id, similarity) of the recipes most like a recipe
+
+    Candidates are the recipes sharing an LSH bucket, found through the
+    GIN index and ranked by shared buckets, then scored exactly.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT candidate.recipe_id
+            FROM {RecipeSignature._meta.db_table} target
+            JOIN {RecipeSignature._meta.db_table} candidate
+                ON candidate.buckets && target.buckets
+                AND candidate.recipe_id <> target.recipe_id
+            WHERE target.recipe_id = %s
+            ORDER BY cardinality(ARRAY(
+                SELECT unnest(candidate.buckets)
+                INTERSECT SELECT unnest(target.buckets)
+            )) DESC, candidate.recipe_id
+            LIMIT %s
+            """,
+            [recipe_id, CANDIDATES]
+        )
+        candidate_ids = [row[0] for row in cursor.fetchall()]
+    if not candidate_ids:
+        return []
+
+    features = get_features(candidate_ids + [recipe_id])
+    target = features[recipe_id]
+    scored = [
+        (candidate_id, jaccard(target, features[candidate_id]))
+        for candidate_id in candidate_ids
+    ]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+
+    return [item for item in scored[:limit] if item[1] > 0]
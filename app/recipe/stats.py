@@ -0,0 +1,201 @@
+from django.db import connection
+from django.db.models import Min, Max
+from core.models import Recipe, RecipeStats, Tag, TagUsage, Ingredient
+
+STATS_TABLE = RecipeStats._meta.db_table
+USAGE_TABLE = TagUsage._meta.db_table
+TOP_TAGS = 5
+
+
+def add_to_stats(user_id, recipes=0, time_minutes=0, price=None, tags=0,
+                 ingredients=0):
+    """Add to the stats of a user, creating them on the first write"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {STATS_TABLE} AS stats (
+                user_id, recipe_count, total_time_minutes, min_price,
+                max_price, tag_count, ingredient_count, ingredients_version
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, 0)
+            ON CONFLICT (user_id) DO UPDATE SET
+                recipe_count = stats.recipe_count + EXCLUDED.recipe_count,
+                total_time_minutes =
+                    stats.total_time_minutes + EXCLUDED.total_time_minutes,
+                min_price = LEAST(stats.min_price, EXCLUDED.min_price),
+                max_price = GREATEST(stats.max_price, EXCLUDED.max_price),
+                tag_count = stats.tag_count + EXCLUDED.tag_count,
+                ingredient_count =
+                    stats.ingredient_count + EXCLUDED.ingredient_count
+            """,
+            [user_id, recipes, time_minutes, price, price, tags, ingredients]
+        )
+
+
+def subtract_from_stats(user_id, recipes=0, time_minutes=0, tags=0,
+                        ingredients=0):
+    """Subtract from the stats of a user, if the user still has them
+
+    Never inserts, so rows deleted along with their user stay deleted.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {STATS_TABLE} SET
+                recipe_count = recipe_count - %s,
+                total_time_minutes = total_time_minutes - %s,
+                tag_count = tag_count - %s,
+                ingredient_count = ingredient_count - %s
+            WHERE user_id = %s
+            """,
+            [recipes, time_minutes, tags, ingredients, user_id]
+        )
+
+
+def refresh_price_range(user_id):
+    """Recompute the price range of a user after a price left it"""
+    prices = Recipe.objects.filter(user_id=user_id).aggregate(
+        min_price=Min("price"),
+        max_price=Max("price")
+    )
+    RecipeStats.objects.filter(user_id=user_id).update(**prices)
+
+
+def add_tag_usage(tag_ids, count=1):
+    """Count count more recipes for each tag"""
+    if not tag_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {USAGE_TABLE} AS tag_usage (
+                tag_id, user_id, recipe_count
+            )
+            SELECT id, user_id, %s FROM {Tag._meta.db_table}
+            WHERE id = ANY(%s)
+            ON CONFLICT (tag_id) DO UPDATE SET
+                recipe_count =
+                    tag_usage.recipe_count + EXCLUDED.recipe_count
+            """,
+            [count, list(tag_ids)]
+        )
+
+
+def subtract_tag_usage(tag_ids, count=1):
+    """Count count fewer recipes for each tag"""
+    if not tag_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {USAGE_TABLE} SET recipe_count = recipe_count - %s
+            WHERE tag_id = ANY(%s)
+            """,
+            [count, list(tag_ids)]
+        )
+
+
+def recipe_saved(recipe, created, update_fields=None):
+    """Apply a recipe insert or update to its user stats"""
+    current = {"time_minutes": recipe.time_minutes, "price": recipe.price}
+    loaded = getattr(recipe, "_loaded_values", None)
+    recipe._loaded_values = current
+
+    if created:
+        add_to_stats(
+            recipe.user_id,
+            recipes=1,
+            time_minutes=recipe.time_minutes,
+            price=recipe.price
+        )
+        return
+    if update_fields is not None and not set(current) & set(update_fields):
+        return
+    if loaded is None or not set(current) <= set(loaded):
+        rebuild_stats([recipe.user_id])
+        return
+
+    time_delta = recipe.time_minutes - loaded["time_minutes"]
+    if time_delta:
+        add_to_stats(recipe.user_id, time_minutes=time_delta)
+    if recipe.price != loaded["price"]:
+        refresh_price_range(recipe.user_id)
+
+
+def recipe_deleted(recipe):
+    """Remove a deleted recipe from its user stats"""
+    subtract_from_stats(
+        recipe.user_id,
+        recipes=1,
+        time_minutes=recipe.time_minutes
+    )
+    refresh_price_range(recipe.user_id)
+
+
+def get_top_tags(user, limit=TOP_TAGS):
+    """Return the tags of a user used by the most recipes"""
+    usages = TagUsage.objects.filter(
+        user=user,
+        recipe_count__gt=0
+    ).select_related("tag").order_by("-recipe_count", "tag_id")[:limit]
+
+    return [
+        {
+            "id": usage.tag_id,
+            "name": usage.tag.name,
+            "recipe_count": usage.recipe_count
+        }
+        for usage in usages
+    ]
+
+
+def rebuild_stats(user_ids):
+    """Recompute the stats and tag usage of the given users"""
+    recipe_table = Recipe._meta.db_table
+    user_table = Recipe._meta.get_field("user").related_model._meta.db_table
+    params = {"user_ids": list(user_ids)}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {STATS_TABLE} (
+                user_id, recipe_count, total_time_minutes, min_price,
+                max_price, tag_count, ingredient_count, ingredients_version
+            )
+            SELECT
+                u.id,
+                COUNT(r.id),
+                COALESCE(SUM(r.time_minutes), 0),
+                MIN(r.price),
+                MAX(r.price),
+                (SELECT COUNT(*) FROM {Tag._meta.db_table} t
+                 WHERE t.user_id = u.id),
+                (SELECT COUNT(*) FROM {Ingredient._meta.db_table} i
+                 WHERE i.user_id = u.id),
+                0
+            FROM {user_table} u
+            LEFT JOIN {recipe_table} r ON r.user_id = u.id
+            WHERE u.id = ANY(%(user_ids)s)
+            GROUP BY u.id
+            ON CONFLICT (user_id) DO UPDATE SET
+                recipe_count = EXCLUDED.recipe_count,
+                total_time_minutes = EXCLUDED.total_time_minutes,
+                min_price = EXCLUDED.min_price,
+                max_price = EXCLUDED.max_price,
+                tag_count = EXCLUDED.tag_count,
+                ingredient_count = EXCLUDED.ingredient_count
+            """,
+            params
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {USAGE_TABLE} (tag_id, user_id, recipe_count)
+            SELECT t.id, t.user_id, COUNT(rt.id)
+            FROM {Tag._meta.db_table} t
+            LEFT JOIN {Recipe.tags.through._meta.db_table} rt
+                ON rt.tag_id = t.id
+            WHERE t.user_id = ANY(%(user_ids)s)
+            GROUP BY t.id
+            ON CONFLICT (tag_id) DO UPDATE SET
+                recipe_count = EXCLUDED.recipe_count
+            """,
+            params
+        )
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag
+
+ANALYTICS_URL = reverse("recipe:analytics")
+
+
+def create_recipe(user, **params):
+    """Creates and return a recipe"""
+    defaults = {
+        "title": "Recipe Title",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PrivateAnalyticsApiTests(TestCase):
+    """Test the recipe price and time distributions"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password",
+            name="User"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@mysimpleapplication.com",
+            password="test-password",
+            name="Other"
+        )
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        for minutes in (10, 20, 30, 40, 50):
+            recipe = create_recipe(
+                self.user,
+                time_minutes=minutes,
+                price=minutes / 10
+            )
+            if minutes <= 20:
+                recipe.tags.add(self.vegan)
+        create_recipe(self.other_user, time_minutes=100, price=99.00)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_user_distributions(self):
+        """Test the distributions of the user recipes"""
+        response = self.client.get(ANALYTICS_URL, {"bins": 4})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data["count"], 5)
+        self.assertAlmostEqual(data["correlation"], 1.0)
+        self.assertEqual(data["time_minutes"]["min"], 10)
+        self.assertEqual(data["time_minutes"]["max"], 50)
+        self.assertEqual(data["time_minutes"]["quantiles"]["p50"], 30)
+        self.assertEqual(data["price"]["quantiles"]["p25"], 2)
+        histogram = data["time_minutes"]["histogram"]
+        self.assertEqual([bucket["count"] for bucket in histogram],
+                         [1, 1, 1, 2])
+        self.assertEqual(histogram[0]["start"], 10)
+        self.assertEqual(histogram[-1]["end"], 50)
+
+    def test_distributions_by_tag(self):
+        """Test slicing the distributions by a tag name"""
+        response = self.client.get(ANALYTICS_URL, {"tag": "Vegan"})
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["price"]["max"], 2)
+        self.assertEqual(
+            response.data["price"]["histogram"][0]["count"] +
+            response.data["price"]["histogram"][-1]["count"],
+            2
+        )
+
+    def test_global_distributions_cached(self):
+        """Test the global distributions include every user and are cached"""
+        response = self.client.get(ANALYTICS_URL, {"scope": "global"})
+
+        self.assertEqual(response.data["count"], 6)
+        self.assertEqual(response.data["time_minutes"]["max"], 100)
+
+        create_recipe(self.other_user)
+        with self.assertNumQueries(0):
+            cached = self.client.get(ANALYTICS_URL, {"scope": "global"})
+        self.assertEqual(cached.data["count"], 6)
+
+    def test_no_recipes(self):
+        """Test the distributions of an empty slice"""
+        response = self.client.get(ANALYTICS_URL, {"tag": "Missing"})
+
+        self.assertEqual(response.data["count"], 0)
+        self.assertEqual(response.data["price"]["histogram"], [])
+
+    def test_invalid_parameters(self):
+        """Test invalid scope and bins are bad requests"""
+        for params in ({"scope": "all"}, {"bins": 0}, {"bins": "many"}):
+            response = self.client.get(ANALYTICS_URL, params)
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
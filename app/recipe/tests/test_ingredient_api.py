@@ -129,3 +129,22 @@ class PrivateIngredientApiTests(TestCase):
         response = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(response.data), 1)
+
+    def test_retrieve_ingredients_sparse_fields_assigned(self):
+        """Test limiting fields still returns unique assigned ingredients"""
+        ingredient = Ingredient.objects.create(
+            user=self.user,
+            name="Ingredient 1"
+        )
+        recipe1 = create_recipe(self.user, "Recipe 1")
+        recipe1.ingredients.add(ingredient)
+        recipe2 = create_recipe(self.user, "Recipe 2")
+        recipe2.ingredients.add(ingredient)
+
+        response = self.client.get(
+            INGREDIENTS_URL,
+            {"assigned_only": 1, "fields": "id"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{"id": ingredient.id}])
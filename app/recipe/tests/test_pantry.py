@@ -0,0 +1,220 @@
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Ingredient, RecipeStats
+from recipe import pantry
+
+PANTRY_URL = reverse("recipe:recipe-pantry")
+
+
+def get_detail_url(recipe_id):
+    """Return the recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Creates and return a recipe"""
+    defaults = {
+        "title": "Recipe Title",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PantryIndexTests(TestCase):
+    """Test the in memory ingredient bitsets"""
+
+    def test_match_ranks_by_missing_count(self):
+        """Test matches are ranked by missing ingredients"""
+        index = pantry.PantryIndex(0)
+        index.add(1, [10, 11, 12])
+        index.add(2, [10])
+        index.add(3, [10, 13])
+
+        self.assertEqual(index.match([10, 11], max_missing=1), [
+            (2, []),
+            (1, [12]),
+            (3, [13]),
+        ])
+        self.assertEqual(index.match([10]), [(2, [])])
+
+    def test_remove_ingredients(self):
+        """Test removing ingredients from a recipe"""
+        index = pantry.PantryIndex(0)
+        index.add(1, [10, 11])
+        index.add(2, [12])
+
+        index.remove(1, [11])
+        index.remove(2)
+
+        self.assertEqual(index.match([10]), [(1, [])])
+
+
+class PrivatePantryApiTests(TestCase):
+    """Test the pantry match endpoint"""
+
+    def setUp(self):
+        pantry.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password",
+            name="User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tofu = Ingredient.objects.create(user=self.user, name="Tofu")
+        self.rice = Ingredient.objects.create(user=self.user, name="Rice")
+        self.salt = Ingredient.objects.create(user=self.user, name="Salt")
+        self.bowl = create_recipe(self.user, title="Tofu Bowl")
+        self.bowl.ingredients.add(self.tofu, self.rice, self.salt)
+        self.plain = create_recipe(self.user, title="Plain Rice")
+        self.plain.ingredients.add(self.rice)
+
+    def get_matches(self, ingredients, **params):
+        params["ingredients"] = ",".join(str(i.id) for i in ingredients)
+        response = self.client.get(PANTRY_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (item["title"], item["missing_ingredients"])
+            for item in response.data
+        ]
+
+    def test_covered_recipes(self):
+        """Test only recipes fully covered by the pantry are returned"""
+        self.assertEqual(
+            self.get_matches([self.rice, self.tofu]),
+            [("Plain Rice", [])]
+        )
+
+    def test_missing_ingredients(self):
+        """Test recipes missing a few ingredients are ranked after"""
+        self.assertEqual(
+            self.get_matches([self.rice, self.tofu], max_missing=1),
+            [("Plain Rice", []), ("Tofu Bowl", [self.salt.id])]
+        )
+
+    def test_other_users_recipes_excluded(self):
+        """Test recipes of other users never match"""
+        other = get_user_model().objects.create_user(
+            email="other@mysimpleapplication.com",
+            password="test-password"
+        )
+        create_recipe(other, title="Other Rice").ingredients.add(self.rice)
+
+        self.assertEqual(
+            self.get_matches([self.rice]),
+            [("Plain Rice", [])]
+        )
+
+    def test_other_users_recipes_in_index_excluded(self):
+        """Test recipes of another user in a wrong index are not listed"""
+        other = get_user_model().objects.create_user(
+            email="other@mysimpleapplication.com",
+            password="test-password"
+        )
+        recipe = create_recipe(other, title="Other Rice")
+        pantry.get_index(self.user.id).add(recipe.id, [self.rice.id])
+
+        self.assertEqual(
+            self.get_matches([self.rice]),
+            [("Plain Rice", [])]
+        )
+
+    def test_index_follows_writes(self):
+        """Test recipe writes are applied to the loaded index"""
+        self.get_matches([self.rice])
+        self.client.patch(
+            get_detail_url(self.plain.id),
+            {"ingredients": [self.rice.id, self.salt.id]},
+            format="json"
+        )
+        self.bowl.delete()
+
+        self.assertEqual(
+            self.get_matches([self.rice], max_missing=3),
+            [("Plain Rice", [self.salt.id])]
+        )
+        self.tofu.delete()
+        self.assertEqual(
+            self.get_matches([self.rice, self.salt]),
+            [("Plain Rice", [])]
+        )
+
+    def test_index_patched_in_place(self):
+        """Test a write of this process does not reload the index"""
+        self.get_matches([self.rice])
+        index = pantry.get_index(self.user.id)
+
+        self.plain.ingredients.add(self.tofu)
+
+        self.assertIs(pantry.get_index(self.user.id), index)
+        with self.assertNumQueries(4):
+            self.get_matches([self.rice, self.tofu])
+
+    def test_rolled_back_change_dropped(self):
+        """Test a change rolled back is not served once others write"""
+        self.get_matches([self.rice])
+        try:
+            with transaction.atomic():
+                self.plain.ingredients.add(self.tofu)
+                self.assertEqual(self.get_matches([self.rice]), [])
+                raise DatabaseError("canceling statement")
+        except DatabaseError:
+            pass
+        # Another process commits its own change of the user's ingredients
+        pantry.bump_version(self.user.id)
+
+        self.assertEqual(self.get_matches([self.rice]), [("Plain Rice", [])])
+
+    def test_stale_index_reloaded(self):
+        """Test an index changed by another process is rebuilt"""
+        self.get_matches([self.rice])
+        through = Recipe.ingredients.through
+        through.objects.filter(recipe=self.bowl).delete()
+        RecipeStats.objects.filter(user=self.user).update(
+            ingredients_version=100
+        )
+
+        self.assertEqual(self.get_matches([self.rice]), [("Plain Rice", [])])
+
+    @override_settings(MAX_FILTER_IDS=2, MAX_PANTRY_IDS=3)
+    def test_pantry_ids_limited(self):
+        """Test a pantry may list more ids than the recipe filters"""
+        self.assertEqual(
+            self.get_matches([self.rice, self.tofu, self.salt]),
+            [("Tofu Bowl", []), ("Plain Rice", [])]
+        )
+
+        response = self.client.get(
+            PANTRY_URL,
+            {"ingredients": "1,2,3,4"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_limit(self):
+        """Test the limit keeps the recipes missing the fewest ingredients"""
+        self.assertEqual(
+            self.get_matches([self.rice], max_missing=2, limit=1),
+            [("Plain Rice", [])]
+        )
+
+    def test_invalid_params(self):
+        """Test invalid ingredients, max_missing and limit are rejected"""
+        for params in (
+            {"ingredients": "1,x"},
+            {"max_missing": "-1"},
+            {"limit": "0"},
+            {"limit": "201"},
+            {"limit": "x"},
+        ):
+            response = self.client.get(PANTRY_URL, params)
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
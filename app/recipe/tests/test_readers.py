@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from recipe.readers import RecipeReader
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def get_detail_url(recipe_id):
+    """Return the recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Creates and return a recipe"""
+    defaults = {
+        "title": "Recipe Title",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def render(data):
+    """Render data as the API would"""
+    return JSONRenderer().render(data)
+
+
+class RecipeReaderTests(TestCase):
+    """Test the read only recipe fast path"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password",
+            name="User"
+        )
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        dinner = Tag.objects.create(user=self.user, name="Dinner")
+        tofu = Ingredient.objects.create(user=self.user, name="Tofu")
+        rice = Ingredient.objects.create(user=self.user, name="Rice")
+
+        recipe1 = create_recipe(
+            self.user,
+            title="Tofu Bowl",
+            price=12.5,
+            link="https://recipes.com/tofu"
+        )
+        recipe1.tags.add(vegan, dinner)
+        recipe1.ingredients.add(tofu, rice)
+        recipe2 = create_recipe(self.user, title="Plain Rice", price="3.10")
+        recipe2.ingredients.add(rice)
+        create_recipe(self.user, title="Nothing", time_minutes=1)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_output_matches_serializer(self):
+        """Test the list representation is byte identical"""
+        recipes = Recipe.objects.order_by("-id")
+
+        data = RecipeReader().serialize(recipes)
+
+        expected = RecipeSerializer(recipes, many=True).data
+        self.assertEqual(render(data), render(expected))
+
+    def test_detail_output_matches_serializer(self):
+        """Test the detail representation is byte identical"""
+        recipes = Recipe.objects.order_by("-id")
+
+        data = RecipeReader(detail=True).serialize(recipes)
+
+        expected = RecipeDetailSerializer(recipes, many=True).data
+        self.assertEqual(render(data), render(expected))
+
+    def test_small_batches_match_serializer(self):
+        """Test batching the relation lookups keeps the output"""
+        recipes = Recipe.objects.order_by("id")
+
+        data = RecipeReader(batch_size=1).serialize(recipes)
+
+        expected = RecipeSerializer(recipes, many=True).data
+        self.assertEqual(render(data), render(expected))
+
+    def test_list_query_count(self):
+        """Test listing costs one query plus one per relation"""
+        with self.assertNumQueries(3):
+            RecipeReader().serialize(Recipe.objects.all())
+
+    def test_api_list_matches_serializer(self):
+        """Test the list endpoint returns the serializer output"""
+        response = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        expected = RecipeSerializer(recipes, many=True).data
+        self.assertEqual(response.content, render(expected))
+
+    def test_api_list_streaming(self):
+        """Test the streamed list matches the serializer output"""
+        response = self.client.get(RECIPES_URL, {"format": "json-stream"})
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        expected = RecipeSerializer(recipes, many=True).data
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            render(expected)
+        )
+
+    def test_api_detail_matches_serializer(self):
+        """Test the detail endpoint returns the serializer output"""
+        recipe = Recipe.objects.get(title="Tofu Bowl")
+
+        response = self.client.get(get_detail_url(recipe.id))
+
+        expected = RecipeDetailSerializer(recipe).data
+        self.assertEqual(response.content, render(expected))
+
+    def test_api_detail_not_found(self):
+        """Test retrieving an invalid recipe id returns not found"""
+        response = self.client.get(get_detail_url("invalid"))
+
+        self.assertEqual(response.status_code, 404)
@@ -2,10 +2,13 @@ import tempfile
 import os
 
 from PIL import Image
+from prometheus_client import REGISTRY
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
 from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
@@ -251,6 +254,310 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(serializer2.data, response.data)
         self.assertNotIn(serializer3.data, response.data)
 
+    def test_filtering_recipes_by_time_and_price(self):
+        """Test filtering recipes by maximum time and price range"""
+        create_recipe(user=self.user, title="Quick", time_minutes=5, price=3)
+        create_recipe(user=self.user, title="Slow", time_minutes=90, price=3)
+        create_recipe(user=self.user, title="Dear", time_minutes=5, price=40)
+
+        response = self.client.get(
+            RECIPES_URL,
+            {"max_time": 10, "min_price": "1.50", "max_price": "10"}
+        )
+
+        self.assertEqual(
+            [item["title"] for item in response.data],
+            ["Quick"]
+        )
+
+    def test_ordering_recipes(self):
+        """Test ordering recipes by a column, ties broken by id"""
+        recipe1 = create_recipe(user=self.user, title="B", time_minutes=20)
+        recipe2 = create_recipe(user=self.user, title="A", time_minutes=20)
+        recipe3 = create_recipe(user=self.user, title="C", time_minutes=5)
+
+        response = self.client.get(RECIPES_URL, {"ordering": "time_minutes"})
+        self.assertEqual(
+            [item["id"] for item in response.data],
+            [recipe3.id, recipe1.id, recipe2.id]
+        )
+        response = self.client.get(RECIPES_URL, {"ordering": "-title"})
+        self.assertEqual(
+            [item["id"] for item in response.data],
+            [recipe3.id, recipe1.id, recipe2.id]
+        )
+
+    def test_invalid_filters_rejected(self):
+        """Test invalid ordering and range values return bad request"""
+        for params in ({"ordering": "link"}, {"max_price": "cheap"}):
+            response = self.client.get(RECIPES_URL, params)
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    @override_settings(MAX_FILTER_IDS=2)
+    def test_filter_ids_limited(self):
+        """Test id filters reject more ids than allowed, not duplicates"""
+        tag = create_tag(user=self.user)
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+
+        response = self.client.get(RECIPES_URL, {"tags": f"{tag.id},1,2"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", response.data)
+
+        response = self.client.get(
+            RECIPES_URL,
+            {"tags": f"{tag.id},{tag.id},1"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(RECIPES_URL, {"ingredients": "1,x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_pagination(self):
+        """Test walking the pages of an ordering with equal values"""
+        recipes = [
+            create_recipe(user=self.user, title=f"R{i}", price=i % 2)
+            for i in range(5)
+        ]
+        expected = sorted(
+            recipes,
+            key=lambda recipe: (recipe.price, recipe.id)
+        )
+
+        ids = []
+        response = self.client.get(
+            RECIPES_URL,
+            {"ordering": "price", "page_size": 2, "max_price": 5}
+        )
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            ids += [item["id"] for item in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor returns not found"""
+        response = self.client.get(RECIPES_URL, {"cursor": "invalid"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_recipes_sparse_fields(self):
+        """Test listing only some fields skips the relation lookups"""
+        recipe = create_recipe(user=self.user, title="Sparse")
+        recipe.tags.add(create_tag(user=self.user))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(RECIPES_URL, {"fields": "title,id"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [{"id": recipe.id, "title": recipe.title}]
+        )
+
+    def test_detail_recipe_sparse_fields(self):
+        """Test retrieving a recipe detail with only its tags"""
+        recipe = create_recipe(user=self.user)
+        tag = create_tag(user=self.user)
+        recipe.tags.add(tag)
+
+        response = self.client.get(
+            get_detail_url(recipe.id),
+            {"fields": "tags"}
+        )
+
+        self.assertEqual(
+            response.data,
+            {"tags": [{"id": tag.id, "name": tag.name}]}
+        )
+
+    def test_retrieve_recipes_unknown_field(self):
+        """Test requesting an unknown recipe field is a bad request"""
+        response = self.client.get(RECIPES_URL, {"fields": "title,image"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_recipes_include_relations(self):
+        """Test including each tag and ingredient once next to recipes"""
+        vegan = create_tag(user=self.user, name="Vegan")
+        dinner = create_tag(user=self.user, name="Dinner")
+        tofu = create_ingredient(user=self.user, name="Tofu")
+        recipe1 = create_recipe(user=self.user, title="Recipe 1")
+        recipe1.tags.add(vegan, dinner)
+        recipe1.ingredients.add(tofu)
+        recipe2 = create_recipe(user=self.user, title="Recipe 2")
+        recipe2.tags.add(vegan)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                RECIPES_URL,
+                {"include": "tags,ingredients"}
+            )
+
+        recipes = Recipe.objects.all().order_by("-id")
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], serializer.data)
+        self.assertEqual(response.data["included"], {
+            "ingredients": [{"id": tofu.id, "name": tofu.name}],
+            "tags": [
+                {"id": vegan.id, "name": vegan.name},
+                {"id": dinner.id, "name": dinner.name},
+            ],
+        })
+
+    def test_retrieve_recipes_include_unknown_relation(self):
+        """Test including an unknown relation is a bad request"""
+        response = self.client.get(RECIPES_URL, {"include": "tags,user"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_recipes_include_streaming(self):
+        """Test including relations in a streamed list is a bad request"""
+        create_recipe(user=self.user)
+
+        response = self.client.get(
+            RECIPES_URL,
+            {"include": "tags", "format": "json-stream"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("include", response.json())
+
+    def test_create_recipe_other_user_relations(self):
+        """Test creating a recipe with other users tags reports them all"""
+        user2 = get_user_model().objects.create_user(
+            email="user2@mysimpleapplication.com",
+            password="test2-password",
+            name="User2"
+        )
+        tag = create_tag(user=self.user, name="Own Tag")
+        other_tag1 = create_tag(user=user2, name="Other Tag 1")
+        other_tag2 = create_tag(user=user2, name="Other Tag 2")
+        payload = {
+            "title": "Recipe with foreign tags",
+            "tags": [tag.id, other_tag1.id, other_tag2.id],
+            "time_minutes": 30,
+            "price": 5.00
+        }
+
+        response = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(other_tag1.id), response.data["tags"][0])
+        self.assertIn(str(other_tag2.id), response.data["tags"][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_validate_recipe_relations_batched(self):
+        """Test the related ids are validated with one query per field"""
+        tags = [
+            create_tag(user=self.user, name=f"Tag {i}") for i in range(5)
+        ]
+        ingredients = [
+            create_ingredient(user=self.user, name=f"Ingredient {i}")
+            for i in range(50)
+        ]
+        request = APIRequestFactory().post(RECIPES_URL)
+        request.user = self.user
+        serializer = RecipeSerializer(
+            data={
+                "title": "Big recipe",
+                "tags": [tag.id for tag in tags],
+                "ingredients": [ingredient.id for ingredient in ingredients],
+                "time_minutes": 30,
+                "price": 5.00
+            },
+            context={"request": request}
+        )
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data["tags"], tags)
+        self.assertEqual(
+            serializer.validated_data["ingredients"],
+            ingredients
+        )
+
+    def _patch_queries(self, recipe, payload):
+        """PATCH a recipe and return the SQL statements it ran"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                get_detail_url(recipe.id),
+                payload,
+                format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [query["sql"] for query in context.captured_queries]
+
+    def test_partial_update_unchanged_writes_nothing(self):
+        """Test PATCHing the current values issues no writes"""
+        recipe = create_recipe(user=self.user, title="Autosaved")
+        tag = create_tag(user=self.user)
+        recipe.tags.add(tag)
+
+        queries = self._patch_queries(
+            recipe,
+            {"title": "Autosaved", "tags": [tag.id]}
+        )
+
+        writes = [
+            sql for sql in queries
+            if sql.startswith(("UPDATE", "INSERT", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_partial_update_saves_changed_columns(self):
+        """Test PATCHing a column only updates that column"""
+        recipe = create_recipe(user=self.user, title="Draft")
+
+        queries = self._patch_queries(recipe, {"title": "Final"})
+
+        updates = [sql for sql in queries if sql.startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"title"', updates[0])
+        self.assertNotIn('"time_minutes"', updates[0])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, "Final")
+
+    def test_partial_update_relation_diff(self):
+        """Test PATCHing a relation deletes and inserts only the diff"""
+        recipe = create_recipe(user=self.user)
+        kept = create_tag(user=self.user, name="Kept")
+        removed = create_tag(user=self.user, name="Removed")
+        added1 = create_tag(user=self.user, name="Added 1")
+        added2 = create_tag(user=self.user, name="Added 2")
+        recipe.tags.add(kept, removed)
+        recipe.ingredients.add(create_ingredient(user=self.user))
+
+        queries = self._patch_queries(
+            recipe,
+            {"tags": [kept.id, added1.id, added2.id]}
+        )
+
+        writes = [
+            sql for sql in queries
+            if sql.startswith(("UPDATE", "INSERT", "DELETE")) and
+            '"core_recipe_tags"' in sql.split("(")[0]
+        ]
+        self.assertEqual(len(writes), 2)
+        self.assertTrue(writes[0].startswith('DELETE FROM "core_recipe_tags"'))
+        self.assertTrue(writes[1].startswith('INSERT INTO "core_recipe_tags"'))
+        self.assertEqual(
+            set(recipe.tags.all()),
+            {kept, added1, added2}
+        )
+        self.assertEqual(recipe.ingredients.count(), 1)
+
 
 class RecipeImageUploadTest(TestCase):
     """pass"""
@@ -271,6 +578,9 @@ class RecipeImageUploadTest(TestCase):
     def test_upload_image_to_recipe(self):
         """Test uploading an image to the recipe"""
         url = image_upload_url(self.recipe.id)
+        uploaded = REGISTRY.get_sample_value(
+            "recipe_image_upload_bytes_total"
+        )
         with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
             img = Image.new("RGB", (10, 10))
             img.save(ntf, format="JPEG")
@@ -281,6 +591,10 @@ class RecipeImageUploadTest(TestCase):
         self.assertEqual(rsp.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn("image", rsp.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(
+            REGISTRY.get_sample_value("recipe_image_upload_bytes_total"),
+            uploaded + self.recipe.image.size
+        )
 
     def test_upload_image_bad_request(self):
         """Test uploading invalid image"""
@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from core.models import Recipe, Tag, Ingredient, RecipeStats
+
+
+def seed(**options):
+    """Run seed_data with a small dataset"""
+    defaults = {
+        "users": 3,
+        "recipes_per_user": 4,
+        "tags_per_user": 5,
+        "ingredients_per_user": 10,
+        "batch_users": 2,
+        "stdout": StringIO(),
+    }
+    defaults.update(options)
+    call_command("seed_data", **defaults)
+
+
+def get_recipes(user_ids):
+    """Return the generated values of the recipes of some users"""
+    return list(
+        Recipe.objects.filter(user_id__in=user_ids).order_by("id").values_list(
+            "time_minutes", "price"
+        )
+    )
+
+
+class SeedDataTests(TestCase):
+    """Test the synthetic dataset generator"""
+
+    def test_seed_data(self):
+        """Test the generated rows, relations and stats"""
+        seed()
+
+        users = get_user_model().objects.filter(email__startswith="seed-")
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Ingredient.objects.count(), 30)
+        links = Recipe.ingredients.through.objects
+        self.assertTrue(links.exists())
+        self.assertFalse(
+            links.exclude(ingredient__user_id=F("recipe__user_id")).exists()
+        )
+        self.assertGreater(
+            links.filter(ingredient__name="Ingredient 1").count(),
+            links.filter(ingredient__name="Ingredient 10").count()
+        )
+        for user in users:
+            self.assertEqual(
+                RecipeStats.objects.get(user=user).recipe_count,
+                Recipe.objects.filter(user=user).count()
+            )
+        self.assertTrue(users.first().check_password("seed-password"))
+
+    def test_seed_is_deterministic(self):
+        """Test the same seed generates the same values"""
+        seed(seed=7)
+        first = list(get_user_model().objects.values_list("id", flat=True))
+        seed(seed=7)
+        second = list(get_user_model().objects.exclude(
+            id__in=first
+        ).values_list("id", flat=True))
+
+        self.assertEqual(get_recipes(first), get_recipes(second))
+
+    def test_sequences_advanced(self):
+        """Test rows created afterwards do not collide with seeded ids"""
+        seed()
+
+        user = get_user_model().objects.create_user("new@example.com")
+        Recipe.objects.create(user=user, title="New", time_minutes=1, price=1)
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient, RecipeSignature
+
+
+def get_similar_url(recipe_id):
+    """Return the similar recipes URL"""
+    return reverse("recipe:recipe-similar", args=[recipe_id])
+
+
+def create_recipe(user, title, ingredients=(), tags=()):
+    """Creates and return a recipe with some relations"""
+    recipe = Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+    recipe.ingredients.add(*ingredients)
+    recipe.tags.add(*tags)
+    return recipe
+
+
+class SimilarRecipesApiTests(TestCase):
+    """Test finding recipes with overlapping ingredients and tags"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password",
+            name="User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"Ingredient {i}")
+            for i in range(8)
+        ]
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        self.recipe = create_recipe(
+            self.user, "Base",
+            self.ingredients[:4], [self.vegan]
+        )
+        self.twin = create_recipe(
+            self.user, "Twin",
+            self.ingredients[:4], [self.vegan]
+        )
+        self.close = create_recipe(
+            self.user, "Close",
+            self.ingredients[:3], [self.vegan]
+        )
+        self.unrelated = create_recipe(
+            self.user, "Unrelated",
+            self.ingredients[5:]
+        )
+
+    def get_similar(self, recipe):
+        response = self.client.get(get_similar_url(recipe.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item["id"], item["similarity"]) for item in response.data]
+
+    def test_similar_ranked_by_jaccard(self):
+        """Test similar recipes are ranked by their overlap"""
+        similar = self.get_similar(self.recipe)
+
+        self.assertEqual(similar, [(self.twin.id, 1.0), (self.close.id, 0.8)])
+
+    def test_similar_excludes_other_users(self):
+        """Test recipes of other users are never similar"""
+        other = get_user_model().objects.create_user(
+            email="other@mysimpleapplication.com",
+            password="test-password",
+            name="Other"
+        )
+        create_recipe(other, "Copy", self.ingredients[:4], [self.vegan])
+
+        similar = self.get_similar(self.recipe)
+
+        self.assertEqual([item[0] for item in similar],
+                         [self.twin.id, self.close.id])
+
+    def test_similar_follows_writes(self):
+        """Test changing the ingredients of a recipe updates the index"""
+        self.twin.ingredients.clear()
+        self.unrelated.ingredients.add(*self.ingredients[:4])
+        self.vegan.recipe_set.add(self.unrelated)
+
+        similar = self.get_similar(self.recipe)
+
+        self.assertEqual(
+            similar[:2],
+            [(self.close.id, 0.8), (self.unrelated.id, 0.625)]
+        )
+        self.assertNotIn((self.twin.id, 1.0), similar)
+
+    def test_similar_limit(self):
+        """Test the limit caps the results and must be from 1 to 50"""
+        response = self.client.get(
+            get_similar_url(self.recipe.id),
+            {"limit": 1}
+        )
+        self.assertEqual(
+            [item["id"] for item in response.data],
+            [self.twin.id]
+        )
+
+        for limit in ("-1", "0", "51", "x"):
+            response = self.client.get(
+                get_similar_url(self.recipe.id),
+                {"limit": limit}
+            )
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_similar_other_user_recipe_not_found(self):
+        """Test the similar recipes of another user are not found"""
+        other = get_user_model().objects.create_user(
+            email="other@mysimpleapplication.com",
+            password="test-password",
+            name="Other"
+        )
+        recipe = create_recipe(other, "Other", self.ingredients[:4])
+
+        response = self.client.get(get_similar_url(recipe.id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_similarity_index(self):
+        """Test rebuilding the index from scratch gives the same results"""
+        expected = self.get_similar(self.recipe)
+        RecipeSignature.objects.all().delete()
+
+        call_command("rebuild_similarity_index")
+
+        self.assertEqual(self.get_similar(self.recipe), expected)
+        self.assertEqual(RecipeSignature.objects.count(), 4)
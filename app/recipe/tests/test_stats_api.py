@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient, RecipeStats, TagUsage
+
+STATS_URL = reverse("recipe:stats")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def get_detail_url(recipe_id):
+    """Return the recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Creates and return a recipe"""
+    defaults = {
+        "title": "Recipe Title",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated stats API access"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test required authentication"""
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test the incrementally maintained recipe stats"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@mysimpleapplication.com",
+            password="test-password",
+            name="User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_stats(self):
+        response = self.client.get(STATS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_stats_without_recipes(self):
+        """Test a user without recipes gets empty stats"""
+        data = self.get_stats()
+
+        self.assertEqual(data["recipe_count"], 0)
+        self.assertIsNone(data["avg_time_minutes"])
+        self.assertIsNone(data["min_price"])
+        self.assertEqual(data["top_tags"], [])
+
+    def test_stats_follow_recipe_writes(self):
+        """Test creating, updating and deleting recipes updates the stats"""
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        quick = Tag.objects.create(user=self.user, name="Quick")
+        Ingredient.objects.create(user=self.user, name="Tofu")
+        self.client.post(RECIPES_URL, {
+            "title": "Tofu Bowl",
+            "time_minutes": 20,
+            "price": 12.50,
+            "tags": [vegan.id, quick.id]
+        })
+        recipe = create_recipe(self.user, time_minutes=40, price=3.00)
+        recipe.tags.add(vegan)
+        cheapest = create_recipe(self.user, time_minutes=30, price=1.00)
+
+        data = self.get_stats()
+        self.assertEqual(data["recipe_count"], 3)
+        self.assertEqual(data["avg_time_minutes"], 30)
+        self.assertEqual(data["min_price"], "1.00")
+        self.assertEqual(data["max_price"], "12.50")
+        self.assertEqual(data["tag_count"], 2)
+        self.assertEqual(data["ingredient_count"], 1)
+        self.assertEqual(data["top_tags"], [
+            {"id": vegan.id, "name": "Vegan", "recipe_count": 2},
+            {"id": quick.id, "name": "Quick", "recipe_count": 1},
+        ])
+
+        self.client.patch(
+            get_detail_url(recipe.id),
+            {"time_minutes": 10, "tags": [quick.id]},
+            format="json"
+        )
+        self.client.delete(get_detail_url(cheapest.id))
+
+        data = self.get_stats()
+        self.assertEqual(data["recipe_count"], 2)
+        self.assertEqual(data["avg_time_minutes"], 15)
+        self.assertEqual(data["min_price"], "3.00")
+        self.assertEqual(data["top_tags"], [
+            {"id": quick.id, "name": "Quick", "recipe_count": 2},
+            {"id": vegan.id, "name": "Vegan", "recipe_count": 1},
+        ])
+
+    def test_stats_read_is_constant(self):
+        """Test reading the stats does not depend on the recipe count"""
+        for i in range(10):
+            create_recipe(self.user, title=f"Recipe {i}")
+
+        with self.assertNumQueries(2):
+            self.get_stats()
+
+    def test_deleting_recipe_updates_tag_usage(self):
+        """Test deleting a recipe stops counting its tags"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+
+        recipe.delete()
+
+        self.assertEqual(TagUsage.objects.get(tag=tag).recipe_count, 0)
+
+    def test_rebuild_stats(self):
+        """Test the rebuild command matches the incremental stats"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = create_recipe(self.user, time_minutes=15, price=7.25)
+        recipe.tags.add(tag)
+        create_recipe(self.user, time_minutes=5, price=2.00)
+        expected = self.get_stats()
+        RecipeStats.objects.all().delete()
+        TagUsage.objects.all().delete()
+
+        call_command("rebuild_stats")
+
+        self.assertEqual(self.get_stats(), expected)
+        stats = RecipeStats.objects.get(user=self.user)
+        self.assertEqual(stats.min_price, Decimal("2.00"))
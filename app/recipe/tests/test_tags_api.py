@@ -113,3 +113,18 @@ class PrivateTagsApiTest(TestCase):
         response = self.client.get(TAGS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(response.data), 1)
+
+    def test_retrieve_tags_sparse_fields(self):
+        """Test limiting the tag fields with the fields parameter"""
+        tag = Tag.objects.create(user=self.user, name="Tag 1")
+
+        response = self.client.get(TAGS_URL, {"fields": "id"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{"id": tag.id}])
+
+    def test_retrieve_tags_unknown_field(self):
+        """Test requesting an unknown field is a bad request"""
+        response = self.client.get(TAGS_URL, {"fields": "id,user"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,13 +1,61 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.http import Http404
 from rest_framework.decorators import action
+from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import viewsets, mixins, status
+from rest_framework import viewsets, mixins, status, generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
+from rest_framework.settings import api_settings
+from core import metrics
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+from core.streaming import StreamingJSONRenderer, StreamingJSONResponse
+from recipe import serializers, readers, analytics, similarity, pantry
+from recipe.pagination import KeysetPagination
+
+
+class SparseFieldsMixin:
+    """Limit reads to the fields requested with ?fields=id,name"""
+    requested_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        """Parse the requested fields once the request is authorized"""
+        super().initial(request, *args, **kwargs)
+        if self.action in ("list", "retrieve"):
+            self.requested_fields = self._parse_fields(
+                request.query_params.get("fields")
+            )
+
+    def _parse_fields(self, qs):
+        """Return the requested fields in serializer order, None for all"""
+        requested = {
+            name.strip() for name in (qs or "").split(",") if name.strip()
+        }
+        if not requested:
+            return None
+        available = self.get_serializer_class().Meta.fields
+        unknown = requested.difference(available)
+        if unknown:
+            raise ValidationError({
+                "fields": [
+                    f"Unknown field: {name}" for name in sorted(unknown)
+                ]
+            })
+
+        return tuple(name for name in available if name in requested)
 
+    def get_serializer(self, *args, **kwargs):
+        """Trim the serializer to the requested fields"""
+        if self.requested_fields is not None:
+            kwargs.setdefault("fields", self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
 
-class BaseRecipeAttributesViewSet(viewsets.GenericViewSet,
+
+class BaseRecipeAttributesViewSet(SparseFieldsMixin,
+                                  viewsets.GenericViewSet,
                                   mixins.ListModelMixin,
                                   mixins.CreateModelMixin):
     authentication_classes = (TokenAuthentication,)
@@ -21,6 +69,8 @@ class BaseRecipeAttributesViewSet(viewsets.GenericViewSet,
         queryset = self.queryset
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
+        if self.requested_fields is not None:
+            queryset = queryset.only(*self.requested_fields)
 
         return queryset.filter(
             user=self.request.user
@@ -43,30 +93,158 @@ class IngredientViewSet(BaseRecipeAttributesViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (
+        StreamingJSONRenderer,
+    )
+    pagination_class = KeysetPagination
+    ordering_fields = ("time_minutes", "price", "title")
+    max_similar = 50
+    max_pantry_matches = 200
+
+    def _params_to_int(self, qs, name, max_ids=None):
+        """Convert a comma delimited string to a list of unique integers
+
+        At most max_ids are accepted, MAX_FILTER_IDS by default.
+        """
+        if max_ids is None:
+            max_ids = settings.MAX_FILTER_IDS
+        try:
+            ids = list(dict.fromkeys(int(str_id) for str_id in qs.split(",")))
+        except ValueError:
+            raise ValidationError({name: ["Expected comma separated ids."]})
+        if len(ids) > max_ids:
+            raise ValidationError({
+                name: [f"Expected at most {max_ids} ids."]
+            })
+        return ids
+
+    def _params_to_relations(self, qs):
+        """Convert a comma delimited string to a list of recipe relations"""
+        relations = [name.strip() for name in (qs or "").split(",")]
+        relations = [name for name in relations if name]
+        unknown = set(relations).difference(readers.RELATED_FIELDS)
+        if unknown:
+            raise ValidationError({
+                "include": [
+                    f"Unknown relation: {name}" for name in sorted(unknown)
+                ]
+            })
+
+        return [name for name in readers.RELATED_FIELDS if name in relations]
+
+    def _params_to_number(self, name, convert):
+        """Convert a query parameter with convert, None when missing"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return convert(value)
+        except (ValueError, InvalidOperation):
+            raise ValidationError({name: ["A valid number is required."]})
 
-    def _params_to_int(self, qs):
-        """Convert a comma delimited string to a list of integers"""
-        return [int(str_id) for str_id in qs.split(",")]
+    def _params_to_ordering(self, qs):
+        """Convert ?ordering= to an order_by ending with the id"""
+        if not qs:
+            return ("-id",)
+        descending = qs.startswith("-")
+        field = qs.lstrip("-")
+        if field not in self.ordering_fields:
+            raise ValidationError({
+                "ordering": [
+                    f"Expected one of {', '.join(self.ordering_fields)}."
+                ]
+            })
+        prefix = "-" if descending else ""
+        return (f"{prefix}{field}", f"{prefix}id")
 
     def get_queryset(self):
         """Retireve recipes filtered by the user"""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
+        max_time = self._params_to_number("max_time", int)
+        min_price = self._params_to_number("min_price", Decimal)
+        max_price = self._params_to_number("max_price", Decimal)
         queryset = self.queryset
         if tags:
-            tag_id_list = self._params_to_int(tags)
+            tag_id_list = self._params_to_int(tags, "tags")
             queryset = queryset.filter(tags__id__in=tag_id_list)
         if ingredients:
-            ingredient_id_list = self._params_to_int(ingredients)
+            ingredient_id_list = self._params_to_int(
+                ingredients,
+                "ingredients"
+            )
             queryset = queryset.filter(ingredients__id__in=ingredient_id_list)
+        if max_time is not None:
+            queryset = queryset.filter(time_minutes__lte=max_time)
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        return queryset.filter(user=self.request.user).order_by(
+            *self._params_to_ordering(
+                self.request.query_params.get("ordering")
+            )
+        )
+
+    def list(self, request, *args, **kwargs):
+        """List recipes through the read only fast path"""
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = readers.get_reader(fields=self.requested_fields)
+        include = self._params_to_relations(
+            request.query_params.get("include")
+        )
+        page = self.paginate_queryset(queryset)
+        streaming = isinstance(
+            request.accepted_renderer,
+            StreamingJSONRenderer
+        )
+        if include and streaming:
+            raise ValidationError({
+                "include": ["Not supported by the json-stream format."]
+            })
+        if page is None and streaming:
+            return StreamingJSONResponse(
+                reader.iter_serialize(queryset),
+                renderer=request.accepted_renderer
+            )
+
+        if include:
+            data = reader.serialize_compound(
+                queryset if page is None else page,
+                include
+            )
+        else:
+            data = reader.serialize(queryset if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe detail through the read only fast path"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError):
+            raise Http404
 
-        return queryset.filter(user=self.request.user).order_by("-id")
+        reader = readers.get_reader(
+            detail=True,
+            fields=self.requested_fields
+        )
+        data = reader.serialize(queryset)
+        if not data:
+            raise Http404
+        return Response(data[0])
 
     def get_serializer_class(self):
         """Return the correct serializer for the action"""
@@ -80,6 +258,79 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Creates a new recipe"""
         serializer.save(user=self.request.user)
 
+    @action(methods=["GET"], detail=True)
+    def similar(self, request, pk=None):
+        """List the recipes sharing the most ingredients and tags"""
+        recipe = self.get_object()
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_similar:
+            raise ValidationError({
+                "limit": [f"Expected a number from 1 to {self.max_similar}."]
+            })
+
+        scores = dict(similarity.find_similar(recipe.id, limit=limit))
+        data = readers.get_reader().serialize(
+            Recipe.objects.filter(user=request.user, id__in=scores)
+        )
+        for item in data:
+            item["similarity"] = round(scores[item["id"]], 4)
+        data.sort(key=lambda item: (-item["similarity"], item["id"]))
+
+        return Response(data)
+
+    @action(methods=["GET"], detail=False)
+    def pantry(self, request):
+        """List the recipes cookable from ?ingredients= with ?max_missing=
+
+        At most ?limit= recipes are listed, the fewest missing first.
+        """
+        ingredients = request.query_params.get("ingredients")
+        ingredient_ids = (
+            self._params_to_int(
+                ingredients,
+                "ingredients",
+                max_ids=settings.MAX_PANTRY_IDS
+            )
+            if ingredients else []
+        )
+        try:
+            max_missing = int(request.query_params.get("max_missing", 0))
+        except ValueError:
+            max_missing = -1
+        if max_missing < 0:
+            raise ValidationError({
+                "max_missing": ["Expected a non negative integer."]
+            })
+        try:
+            limit = int(request.query_params.get("limit", 50))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.max_pantry_matches:
+            raise ValidationError({
+                "limit": [
+                    f"Expected a number from 1 to {self.max_pantry_matches}."
+                ]
+            })
+
+        matches = pantry.find_cookable(
+            request.user.id,
+            ingredient_ids,
+            max_missing=max_missing
+        )[:limit]
+        missing = dict(matches)
+        data = readers.get_reader().serialize(
+            Recipe.objects.filter(user=request.user, id__in=missing)
+        )
+        for item in data:
+            item["missing_ingredients"] = missing[item["id"]]
+        rank = {recipe_id: i for i, (recipe_id, _) in enumerate(matches)}
+        data.sort(key=lambda item: rank[item["id"]])
+
+        return Response(data)
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Uploads an image to the recipe"""
@@ -91,6 +342,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            metrics.UPLOADED_BYTES.inc(recipe.image.size)
             return Response(
                 serializer.data,
                 status=status.HTTP_202_ACCEPTED
@@ -99,3 +351,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class RecipeStatsView(generics.RetrieveAPIView):
+    """Retrieve the recipe stats of the authenticated user"""
+    serializer_class = serializers.RecipeStatsSerializer
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_object(self):
+        """Retrieve the stats row, empty stats for users without recipes"""
+        try:
+            return RecipeStats.objects.get(user=self.request.user)
+        except RecipeStats.DoesNotExist:
+            return RecipeStats(user=self.request.user)
+
+
+class RecipeAnalyticsView(APIView):
+    """Price and time distributions of the user's or of all recipes"""
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    max_bins = 100
+
+    def get(self, request, *args, **kwargs):
+        """Return the distributions for ?scope=user|global&tag=&bins="""
+        scope = request.query_params.get("scope", "user")
+        tag = request.query_params.get("tag") or None
+        try:
+            bins = int(request.query_params.get("bins", 10))
+        except ValueError:
+            bins = 0
+        if scope not in ("user", "global"):
+            raise ValidationError({"scope": ["Expected user or global."]})
+        if not 1 <= bins <= self.max_bins:
+            raise ValidationError({
+                "bins": [f"Expected a number from 1 to {self.max_bins}."]
+            })
+
+        if scope == "global":
+            data = analytics.get_global_distributions(tag=tag, bins=bins)
+        else:
+            data = analytics.compute_distributions(
+                user_id=request.user.id,
+                tag=tag,
+                bins=bins
+            )
+        return Response(data)
@@ -1,6 +1,9 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from core import metrics
+from core.deletion import request_deletion
 
 from user.serializers import UserSerializer, AuthTokenSerializer
 
@@ -15,8 +18,18 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        """Create the token, counting the login attempt"""
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            metrics.LOGIN_ATTEMPTS.labels("failure").inc()
+            raise
+        metrics.LOGIN_ATTEMPTS.labels("success").inc()
+        return response
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     authentication_classes = (authentication.TokenAuthentication,)
@@ -25,3 +38,8 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return authentication user"""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the user now, their data is purged in background"""
+        request_deletion(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)